@@ -1,37 +1,78 @@
 # EduPDF Backend Source Code
 
 # Import necessary libraries
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form, status
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form, Query, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 from typing import List, Optional
 from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import json
+import multiprocessing
 import os
 import shutil
+import threading
 import jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel, Field
 import sqlite3
+import struct
+import tarfile
 import uuid
+import zlib
+
+# Bump whenever setup_db changes the schema; databases already at this
+# version skip the CREATE TABLE checks on startup
+SCHEMA_VERSION = 3
 
 # Database models and connection
 class Database:
     def __init__(self, db_path="app.db"):
+        # Nothing is opened here; the connection and schema are set up by
+        # the application lifespan so importing this module has no side effects
         self.db_path = db_path
         self.conn = None
-        self.setup_db()
+    
+    def connect(self):
+        # A fresh connection; requests get one each through get_db. It may be
+        # closed by a different threadpool thread than the one that opened it.
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
     
     def get_connection(self):
+        # Long-lived connection for setup_db, the compress-text command and
+        # dictionary reloads (which hold TextCodec.lock); never used by requests
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = self.connect()
         return self.conn
     
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+    
     def setup_db(self):
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        # WAL lets readers and the writer run at the same time. In the default
+        # rollback journal mode the long read transaction of GET /export holds
+        # a SHARED lock, and every write by any user fails with "database is
+        # locked" until the export finishes. The mode is stored in the file,
+        # but this runs before the version check so existing databases switch.
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] >= SCHEMA_VERSION:
+            return
+        
         # Create users table
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -115,8 +156,215 @@ class Database:
         )
         ''')
         
+        # Create compression_dictionaries table
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS compression_dictionaries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            artifact TEXT NOT NULL,
+            codec INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            created_at TEXT NOT NULL
+        )
+        ''')
+        
+        # Create blobs table (content hashes of imported files, for dedup)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY,
+            file_path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at TEXT NOT NULL
+        )
+        ''')
+        
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
 
+# Text compression
+# Large generated text is stored as a compressed BLOB, using zstd when the
+# optional zstandard package is installed and zlib otherwise, with a shared
+# dictionary per artifact type once one has been trained. Short values and
+# rows written before compression stay plain TEXT; the SQLite storage class
+# tells the two apart, so reads decode transparently.
+COMPRESSED_COLUMNS = {
+    "summary": ("summaries", "content"),
+    "flashcard": ("flashcards", "definition"),
+    "question": ("quiz_questions", "question"),
+}
+COMPRESSION_MIN_BYTES = 64
+COMPRESSION_DICT_BYTES = 32 * 1024  # also zlib's maximum window
+COMPRESSION_TRAINING_SAMPLES = 2000
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+# Every compressed value starts with its codec and dictionary id (0 = none)
+COMPRESSION_HEADER = struct.Struct(">BI")
+
+def load_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+class TextCodec:
+    def __init__(self):
+        self.dictionaries = {}  # dictionary id -> (codec, data)
+        self.current = {}  # artifact -> dictionary id used for new values
+        self.zstd_dicts = {}  # dictionary id -> prepared zstandard dictionary
+        self.zstd = None
+        self.conn = None  # connection dictionaries were last loaded from
+        self.lock = threading.Lock()
+    
+    def load(self, conn):
+        self.zstd = load_zstandard()
+        rows = conn.execute(
+            "SELECT id, artifact, codec, data FROM compression_dictionaries ORDER BY id"
+        ).fetchall()
+        self.conn = conn
+        self.zstd_dicts = {}
+        self.dictionaries = {row["id"]: (row["codec"], bytes(row["data"])) for row in rows}
+        # The newest dictionary of an artifact is used for writes, as long as
+        # its codec is available in this process
+        self.current = {
+            row["artifact"]: row["id"] for row in rows
+            if row["codec"] == CODEC_ZLIB or self.zstd is not None
+        }
+    
+    def dictionary(self, dictionary_id):
+        # compress-text runs in its own process and may add dictionaries while
+        # the server is up, so an unknown id means reloading, not corruption
+        if dictionary_id not in self.dictionaries:
+            with self.lock:
+                if dictionary_id not in self.dictionaries and self.conn is not None:
+                    self.load(self.conn)
+            if dictionary_id not in self.dictionaries:
+                raise ValueError(f"Unknown compression dictionary {dictionary_id}")
+        return self.dictionaries[dictionary_id]
+    
+    def default_codec(self):
+        return CODEC_ZSTD if self.zstd is not None else CODEC_ZLIB
+    
+    def encode(self, artifact, text):
+        raw = text.encode("utf-8")
+        if len(raw) < COMPRESSION_MIN_BYTES:
+            return text
+        dictionary_id = self.current.get(artifact, 0)
+        codec = self.dictionaries[dictionary_id][0] if dictionary_id else self.default_codec()
+        body = self._compress(codec, dictionary_id, raw)
+        if COMPRESSION_HEADER.size + len(body) >= len(raw):
+            return text
+        return COMPRESSION_HEADER.pack(codec, dictionary_id) + body
+    
+    def decode(self, value):
+        if not isinstance(value, bytes):
+            return value
+        codec, dictionary_id = COMPRESSION_HEADER.unpack_from(value)
+        body = value[COMPRESSION_HEADER.size:]
+        if codec == CODEC_ZSTD:
+            if self.zstd is None:
+                raise RuntimeError("zstandard is required to read zstd-compressed text")
+            dictionary = self._zstd_dict(dictionary_id)
+            if dictionary is not None:
+                raw = self.zstd.ZstdDecompressor(dict_data=dictionary).decompress(body)
+            else:
+                raw = self.zstd.ZstdDecompressor().decompress(body)
+        else:
+            if dictionary_id:
+                raw = zlib.decompressobj(zdict=self.dictionary(dictionary_id)[1]).decompress(body)
+            else:
+                raw = zlib.decompress(body)
+        return raw.decode("utf-8")
+    
+    def train(self, samples):
+        # Returns (codec, dictionary data) or None when the samples are not
+        # enough to train on
+        encoded = [s.encode("utf-8") for s in samples]
+        if self.zstd is not None:
+            try:
+                trained = self.zstd.train_dictionary(COMPRESSION_DICT_BYTES, encoded)
+            except self.zstd.ZstdError:
+                return None
+            return CODEC_ZSTD, trained.as_bytes()
+        # zlib has no trainer; a preset dictionary works best when the most
+        # common content sits at its end, closest to the data being compressed
+        counts = {}
+        for sample in encoded:
+            counts[sample] = counts.get(sample, 0) + 1
+        ordered = sorted(counts, key=counts.get)
+        data = b"".join(ordered)[-COMPRESSION_DICT_BYTES:]
+        return (CODEC_ZLIB, data) if data else None
+    
+    def _compress(self, codec, dictionary_id, raw):
+        if codec == CODEC_ZSTD:
+            dictionary = self._zstd_dict(dictionary_id)
+            if dictionary is not None:
+                return self.zstd.ZstdCompressor(level=3, dict_data=dictionary).compress(raw)
+            return self.zstd.ZstdCompressor(level=3).compress(raw)
+        if dictionary_id:
+            compressor = zlib.compressobj(6, zdict=self.dictionaries[dictionary_id][1])
+            return compressor.compress(raw) + compressor.flush()
+        return zlib.compress(raw, 6)
+    
+    def _zstd_dict(self, dictionary_id):
+        if not dictionary_id:
+            return None
+        dictionary = self.zstd_dicts.get(dictionary_id)
+        if dictionary is None:
+            dictionary = self.zstd.ZstdCompressionDict(self.dictionary(dictionary_id)[1])
+            dictionary.precompute_compress(level=3)
+            self.zstd_dicts[dictionary_id] = dictionary
+        return dictionary
+
+text_codec = TextCodec()
+
+def compress_existing_text(conn, batch_size=1000, vacuum=False):
+    # Migration: train a dictionary for every artifact that has none yet, then
+    # rewrite its remaining plain TEXT values in batches. Safe to re-run.
+    text_codec.load(conn)
+    stats = {}
+    for artifact, (table, column) in COMPRESSED_COLUMNS.items():
+        if artifact not in text_codec.current:
+            samples = [
+                row[0] for row in conn.execute(
+                    f"SELECT {column} FROM {table} WHERE typeof({column}) = 'text' "
+                    f"ORDER BY random() LIMIT ?",
+                    (COMPRESSION_TRAINING_SAMPLES,)
+                )
+            ]
+            trained = text_codec.train(samples) if samples else None
+            if trained is not None:
+                conn.execute(
+                    "INSERT INTO compression_dictionaries (artifact, codec, data, created_at) VALUES (?, ?, ?, ?)",
+                    (artifact, trained[0], trained[1], datetime.utcnow().isoformat())
+                )
+                conn.commit()
+                text_codec.load(conn)
+        
+        compressed = 0
+        last_rowid = 0
+        while True:
+            rows = conn.execute(
+                f"SELECT rowid, {column} FROM {table} WHERE typeof({column}) = 'text' AND rowid > ? "
+                f"ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            updates = []
+            for rowid, value in rows:
+                encoded = text_codec.encode(artifact, value)
+                if isinstance(encoded, bytes):
+                    updates.append((encoded, rowid))
+            conn.executemany(f"UPDATE {table} SET {column} = ? WHERE rowid = ?", updates)
+            conn.commit()
+            compressed += len(updates)
+        stats[artifact] = compressed
+    
+    if vacuum:
+        conn.execute("VACUUM")
+    return stats
+
 # Pydantic models for request/response
 class UserCreate(BaseModel):
     email: str
@@ -187,7 +435,17 @@ class StudyProgressResponse(BaseModel):
     last_accessed: str
 
 # Security utilities
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib and bcrypt are only loaded once a password is actually hashed or
+# verified, keeping them off the import path of every worker
+_pwd_context = None
+
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 SECRET_KEY = "your-secret-key"  # In production, use a secure environment variable
@@ -195,10 +453,10 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -224,7 +482,18 @@ def authenticate_user(db, email: str, password: str):
         return False
     return user
 
-def get_current_user(db, token: str = Depends(oauth2_scheme)):
+def get_db():
+    # One connection per request, so one request's commit() never commits
+    # another's half-written rows. Closing it discards anything a failed
+    # handler left uncommitted. FastAPI caches the dependency, so
+    # get_current_user and the handler share the connection.
+    conn = db.connect()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def get_current_user(token: str = Depends(oauth2_scheme), conn: sqlite3.Connection = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -239,7 +508,7 @@ def get_current_user(db, token: str = Depends(oauth2_scheme)):
     except jwt.PyJWTError:
         raise credentials_exception
     
-    cursor = db.cursor()
+    cursor = conn.cursor()
     cursor.execute("SELECT * FROM users WHERE id = ?", (token_data.user_id,))
     user = cursor.fetchone()
     
@@ -305,8 +574,615 @@ def generate_summary(text, max_length=500):
     summary = "EduPDF is a comprehensive platform designed to transform static PDF documents into interactive learning materials. It provides features such as quiz generation, flashcard creation, and document summarization to enhance the learning experience. The platform uses AI to analyze document content and generate relevant educational materials."
     return summary[:min(max_length, len(summary))]
 
+# Thumbnail rendering
+# Page previews are rendered with PyMuPDF in a process pool and kept in a
+# size-bounded LRU cache on disk. PyMuPDF is imported inside the worker so
+# the API process never pays for it.
+THUMBNAIL_DIR = os.environ.get("EDUPDF_THUMBNAIL_DIR", "thumbnails")
+THUMBNAIL_CACHE_BYTES = int(os.environ.get("EDUPDF_THUMBNAIL_CACHE_BYTES", 256 * 1024 * 1024))
+THUMBNAIL_WIDTH = 200
+THUMBNAIL_MAX_WIDTH = 800
+THUMBNAIL_WORKERS = int(os.environ.get("EDUPDF_THUMBNAIL_WORKERS", 2))
+# Number of leading pages rendered right after upload; 0 disables it
+THUMBNAIL_PRERENDER_PAGES = int(os.environ.get("EDUPDF_THUMBNAIL_PRERENDER_PAGES", 0))
+
+def render_page_thumbnail(file_path, page_number, width):
+    # Runs in a worker process; page_number is 1-based. A missing or corrupt
+    # file raises ValueError.
+    import pymupdf
+    try:
+        pdf = pymupdf.open(file_path)
+    except RuntimeError as e:
+        # pymupdf.FileNotFoundError and FileDataError are RuntimeErrors;
+        # re-raised as a builtin so the API process can unpickle the error
+        # without importing PyMuPDF
+        raise ValueError(f"Cannot open {os.path.basename(file_path)}: {e}") from None
+    with pdf:
+        if not 1 <= page_number <= pdf.page_count:
+            raise IndexError(f"Page {page_number} out of range")
+        page = pdf[page_number - 1]
+        zoom = width / page.rect.width
+        pixmap = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+        return pixmap.tobytes("jpeg", jpg_quality=75)
+
+class ThumbnailCache:
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # file name -> size, least recently used first
+        self.rendering = set()  # keys being rendered that put() may still store
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.loaded = False
+    
+    def load(self):
+        # Rebuild the LRU order from modification times, which get() refreshes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+            files = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith(".jpg"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+            for _, name, size in sorted(files):
+                self.entries[name] = size
+                self.total_bytes += size
+            self._evict()
+            self.loaded = True
+    
+    def key(self, document_id, page_number, width):
+        return f"{document_id}-{page_number}-{width}.jpg"
+    
+    def get(self, key):
+        # Returns the image bytes rather than a path: they are read under the
+        # lock, so a concurrent put() cannot evict the file before it is served
+        with self.lock:
+            if key not in self.entries:
+                return None
+            path = os.path.join(self.cache_dir, key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+            except FileNotFoundError:
+                self.total_bytes -= self.entries.pop(key)
+                return None
+            self.entries.move_to_end(key)
+            return data
+    
+    def start_render(self, key):
+        with self.lock:
+            self.rendering.add(key)
+    
+    def cancel_render(self, key):
+        with self.lock:
+            self.rendering.discard(key)
+    
+    def put(self, key, data):
+        # Only stores renders that are still wanted; discard_document() drops
+        # the keys of a deleted document so its previews are not re-created
+        with self.lock:
+            if key not in self.rendering:
+                return
+            self.rendering.discard(key)
+            path = os.path.join(self.cache_dir, key)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.total_bytes -= self.entries.pop(key, 0)
+            self.entries[key] = len(data)
+            self.total_bytes += len(data)
+            self._evict(keep=key)
+    
+    def discard_document(self, document_id):
+        if not self.loaded:
+            self.load()
+        prefix = f"{document_id}-"
+        with self.lock:
+            self.rendering = {k for k in self.rendering if not k.startswith(prefix)}
+            for key in [k for k in self.entries if k.startswith(prefix)]:
+                self.total_bytes -= self.entries.pop(key)
+                self._remove_file(key)
+    
+    def _evict(self, keep=None):
+        # Caller holds the lock. The entry just written is never evicted, even
+        # if it alone is larger than the cache.
+        while self.total_bytes > self.max_bytes and self.entries:
+            key = next(iter(self.entries))
+            if key == keep:
+                break
+            self.total_bytes -= self.entries.pop(key)
+            self._remove_file(key)
+    
+    def _remove_file(self, key):
+        try:
+            os.remove(os.path.join(self.cache_dir, key))
+        except FileNotFoundError:
+            pass
+
+class ThumbnailRenderer:
+    def __init__(self, cache, max_workers):
+        self.cache = cache
+        self.max_workers = max_workers
+        self.executor = None
+        self.in_flight = {}  # cache key -> task rendering that page
+    
+    def get_executor(self):
+        # Worker processes are only started once the first page is rendered.
+        # They are spawned rather than forked: forking the multithreaded
+        # server can leave a child stuck on a lock another thread held.
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.executor
+    
+    def reset_executor(self, broken):
+        # A worker died (MuPDF crash, OOM kill); the pool is unusable from then
+        # on, so replace it unless another render already has
+        if self.executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+    
+    async def get_thumbnail(self, document_id, file_path, page_number, width=THUMBNAIL_WIDTH):
+        if not self.cache.loaded:
+            await asyncio.to_thread(self.cache.load)
+        key = self.cache.key(document_id, page_number, width)
+        data = await asyncio.to_thread(self.cache.get, key)
+        if data is not None:
+            return data
+        
+        # Concurrent requests for the same page share one render. The task is
+        # shielded so a disconnecting client does not cancel it for the others.
+        task = self.in_flight.get(key)
+        if task is None:
+            self.cache.start_render(key)
+            task = asyncio.ensure_future(self._render(key, file_path, page_number, width))
+            self.in_flight[key] = task
+        return await asyncio.shield(task)
+    
+    async def _render(self, key, file_path, page_number, width):
+        try:
+            loop = asyncio.get_running_loop()
+            # Retry once on a fresh pool; a second failure is most likely this
+            # page crashing the renderer and is passed on
+            for attempt in range(2):
+                executor = self.get_executor()
+                try:
+                    data = await loop.run_in_executor(
+                        executor, render_page_thumbnail, file_path, page_number, width
+                    )
+                    break
+                except BrokenProcessPool:
+                    self.reset_executor(executor)
+                    if attempt:
+                        raise
+            await asyncio.to_thread(self.cache.put, key, data)
+            return data
+        finally:
+            self.cache.cancel_render(key)
+            self.in_flight.pop(key, None)
+    
+    async def prerender(self, document_id, file_path, page_count):
+        for page_number in range(1, min(THUMBNAIL_PRERENDER_PAGES, page_count) + 1):
+            try:
+                await self.get_thumbnail(document_id, file_path, page_number)
+            except Exception:
+                # Previews are best effort; the endpoint renders on demand
+                return
+    
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+thumbnail_renderer = ThumbnailRenderer(
+    ThumbnailCache(THUMBNAIL_DIR, THUMBNAIL_CACHE_BYTES), THUMBNAIL_WORKERS
+)
+
+# Library export and import
+# An export is an uncompressed tar stream: manifest.json, then every PDF once
+# under blobs/, then the database rows as NDJSON parts, then trailer.json with
+# the blob and row counts so an import can tell a complete archive from a
+# truncated one. Every member is
+# written header first with its size known up front, so neither side ever
+# holds more than one chunk of a file or one NDJSON part in memory.
+ARCHIVE_FORMAT = "edupdf-export"
+ARCHIVE_VERSION = 2
+ARCHIVE_CHUNK_BYTES = 1024 * 1024
+ARCHIVE_PART_BYTES = 8 * 1024 * 1024
+IMPORT_BATCH_ROWS = 1000
+
+# Tables in archive order with the columns exported for each. Documents come
+# first so an import always sees a document before the rows that refer to it.
+ARCHIVE_TABLES = [
+    ("documents", "SELECT id, title, file_path, page_count, created_at FROM documents WHERE user_id = ? ORDER BY rowid"),
+    ("quizzes", "SELECT q.id, q.document_id, q.created_at FROM quizzes q JOIN documents d ON d.id = q.document_id WHERE d.user_id = ? ORDER BY q.rowid"),
+    ("quiz_questions", "SELECT qq.id, qq.quiz_id, qq.question, qq.options, qq.correct_answer FROM quiz_questions qq JOIN quizzes q ON q.id = qq.quiz_id JOIN documents d ON d.id = q.document_id WHERE d.user_id = ? ORDER BY qq.rowid"),
+    ("flashcards", "SELECT f.id, f.document_id, f.term, f.definition, f.created_at FROM flashcards f JOIN documents d ON d.id = f.document_id WHERE d.user_id = ? ORDER BY f.rowid"),
+    ("summaries", "SELECT s.id, s.document_id, s.content, s.created_at FROM summaries s JOIN documents d ON d.id = s.document_id WHERE d.user_id = ? ORDER BY s.rowid"),
+    ("study_progress", "SELECT id, document_id, quiz_score, flashcards_completed, last_accessed FROM study_progress WHERE user_id = ? ORDER BY rowid"),
+]
+
+# Columns written by an import for each table, in the same order
+IMPORT_COLUMNS = [
+    ("documents", ("id", "title", "user_id", "file_path", "page_count", "created_at")),
+    ("quizzes", ("id", "document_id", "created_at")),
+    ("quiz_questions", ("id", "quiz_id", "question", "options", "correct_answer")),
+    ("flashcards", ("id", "document_id", "term", "definition", "created_at")),
+    ("summaries", ("id", "document_id", "content", "created_at")),
+    ("study_progress", ("id", "user_id", "document_id", "quiz_score", "flashcards_completed", "last_accessed")),
+]
+
+def tar_header(name, size, mtime=None):
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mode = 0o644
+    info.mtime = int(mtime if mtime is not None else datetime.utcnow().timestamp())
+    return info.tobuf(format=tarfile.PAX_FORMAT)
+
+def tar_padding(size):
+    return b"\0" * (-size % tarfile.BLOCKSIZE)
+
+def tar_bytes_member(name, data):
+    return tar_header(name, len(data)) + bytes(data) + tar_padding(len(data))
+
+def tar_file_member(name, path):
+    stat = os.stat(path)
+    yield tar_header(name, stat.st_size, stat.st_mtime)
+    remaining = stat.st_size
+    with open(path, "rb") as f:
+        while remaining > 0:
+            chunk = f.read(min(ARCHIVE_CHUNK_BYTES, remaining))
+            if not chunk:
+                raise RuntimeError(f"{path} shrank while being exported")
+            remaining -= len(chunk)
+            yield chunk
+    yield tar_padding(stat.st_size)
+
+def export_row(table, row, blob_names):
+    record = dict(row)
+    if table == "documents":
+        record["blob"] = blob_names.get(record.pop("file_path"))
+    elif table == "quiz_questions":
+        record["question"] = text_codec.decode(record["question"])
+    elif table == "flashcards":
+        record["definition"] = text_codec.decode(record["definition"])
+    elif table == "summaries":
+        record["content"] = text_codec.decode(record["content"])
+    return record
+
+def stream_library_export(user):
+    # Runs in the threadpool as the response body is consumed. A connection
+    # of its own keeps one read transaction open, so the archive is a
+    # consistent snapshot; in WAL mode (see setup_db) writers are not blocked
+    # by it, though the WAL cannot be checkpointed past it until it ends.
+    conn = db.connect()
+    try:
+        conn.execute("BEGIN")
+        manifest = {
+            "format": ARCHIVE_FORMAT,
+            "version": ARCHIVE_VERSION,
+            "export_id": str(uuid.uuid4()),
+            "exported_at": datetime.utcnow().isoformat(),
+            "user": {"email": user["email"], "username": user["username"]},
+        }
+        yield tar_bytes_member("manifest.json", json.dumps(manifest).encode("utf-8"))
+        
+        # Documents sharing a file on disk share one blob in the archive
+        blob_names = {}
+        cursor = conn.execute(
+            "SELECT id, file_path FROM documents WHERE user_id = ? ORDER BY rowid", (user["id"],)
+        )
+        for document in cursor:
+            path = document["file_path"]
+            if path in blob_names or not os.path.isfile(path):
+                continue
+            name = f"blobs/{document['id']}{os.path.splitext(path)[1]}"
+            blob_names[path] = name
+            yield from tar_file_member(name, path)
+        
+        row_counts = {}
+        for table, query in ARCHIVE_TABLES:
+            part = bytearray()
+            part_number = 0
+            row_counts[table] = 0
+            cursor = conn.execute(query, (user["id"],))
+            while True:
+                rows = cursor.fetchmany(IMPORT_BATCH_ROWS)
+                if not rows:
+                    break
+                row_counts[table] += len(rows)
+                for row in rows:
+                    part += json.dumps(export_row(table, row, blob_names)).encode("utf-8") + b"\n"
+                    if len(part) >= ARCHIVE_PART_BYTES:
+                        part_number += 1
+                        yield tar_bytes_member(f"{table}/{part_number:06d}.ndjson", part)
+                        part = bytearray()
+            if part:
+                part_number += 1
+                yield tar_bytes_member(f"{table}/{part_number:06d}.ndjson", part)
+        
+        trailer = {"blobs": len(blob_names), "rows": row_counts}
+        yield tar_bytes_member("trailer.json", json.dumps(trailer).encode("utf-8"))
+        
+        # End-of-archive marker
+        yield b"\0" * (tarfile.BLOCKSIZE * 2)
+    finally:
+        conn.close()
+
+class ArchiveError(ValueError):
+    # An archive the importer rejects; the message is returned to the client
+    pass
+
+class LibraryImporter:
+    # Ids from the archive are mapped to fresh ones with uuid5 under a
+    # namespace derived from the export id and the importing user, so rows
+    # that refer to each other stay linked without an id map in memory, and
+    # importing the same archive twice collides instead of duplicating it.
+    #
+    # Rows are staged in TEMP tables, which do not lock the main database,
+    # and copied over in one short transaction once trailer.json confirms the
+    # archive is complete. New PDFs are written to uploads/ right away, but
+    # their blobs rows only land in that same transaction, so no other import
+    # can deduplicate against a file this one may still remove. A failed
+    # import leaves no rows behind and removes the files it wrote.
+    def __init__(self, conn, user_id, upload_dir="uploads"):
+        self.conn = conn
+        self.user_id = user_id
+        self.upload_dir = upload_dir
+        self.namespace = None  # set from the manifest
+        self.blob_paths = {}  # archive blob name -> local file path
+        self.new_blobs = {}  # sha256 -> (file path, size) written by this import
+        self.shared_blobs = {}  # sha256 -> file path of an already stored blob
+        self.pending = {}  # table -> rows waiting for the next batch insert
+        self.required = {}  # table -> indexes of NOT NULL columns in IMPORT_COLUMNS
+        self.seen_blobs = 0
+        self.seen_rows = {table: 0 for table, _ in ARCHIVE_TABLES}
+        self.stats = {
+            "documents": 0, "quizzes": 0, "quiz_questions": 0, "flashcards": 0,
+            "summaries": 0, "study_progress": 0,
+            "blobs_stored": 0, "blobs_deduplicated": 0, "bytes": 0,
+        }
+    
+    def new_id(self, old_id):
+        return str(uuid.uuid5(self.namespace, str(old_id)))
+    
+    def import_archive(self, fileobj):
+        os.makedirs(self.upload_dir, exist_ok=True)
+        try:
+            self.create_staging_tables()
+            self.read_archive(fileobj)
+            self.commit_staged_rows()
+        except ArchiveError:
+            self.abort()
+            raise
+        except sqlite3.IntegrityError as e:
+            self.abort()
+            # add_row has checked the NOT NULL columns, so what is left are
+            # primary keys, which collide when an archive is imported twice
+            raise ArchiveError(f"Archive was already imported or contains duplicate ids ({e})")
+        except (tarfile.TarError, ValueError, KeyError, TypeError, AttributeError,
+                sqlite3.InterfaceError, sqlite3.ProgrammingError) as e:
+            # Malformed records surface as any of these (JSON and UTF-8
+            # decoding errors are ValueErrors too)
+            self.abort()
+            raise ArchiveError(f"Invalid archive: {e}")
+        except BaseException:
+            self.abort()
+            raise
+        return self.stats
+    
+    def read_archive(self, fileobj):
+        trailer = None
+        # Stream mode reads the archive strictly front to back
+        with tarfile.open(fileobj=fileobj, mode="r|") as tar:
+            for member in tar:
+                if trailer is not None:
+                    raise ArchiveError("Unexpected member after trailer.json")
+                if self.namespace is None:
+                    self.check_manifest(tar, member)
+                elif member.isfile() and member.name == "trailer.json":
+                    trailer = json.load(tar.extractfile(member))
+                elif member.isfile() and member.name.startswith("blobs/"):
+                    self.seen_blobs += 1
+                    self.import_blob(tar.extractfile(member), member.name)
+                elif member.isfile() and member.name.endswith(".ndjson"):
+                    table = member.name.split("/", 1)[0]
+                    if table in self.seen_rows:
+                        self.import_rows(tar.extractfile(member), table)
+        
+        if self.namespace is None:
+            raise ArchiveError("Archive is empty")
+        if trailer is None:
+            raise ArchiveError("Archive is truncated: trailer.json is missing")
+        if not isinstance(trailer, dict) or trailer.get("blobs") != self.seen_blobs or trailer.get("rows") != self.seen_rows:
+            raise ArchiveError("Archive is incomplete: counts do not match trailer.json")
+        self.flush()
+    
+    def check_manifest(self, tar, member):
+        if member.name != "manifest.json" or not member.isfile():
+            raise ArchiveError("Archive does not start with manifest.json")
+        manifest = json.load(tar.extractfile(member))
+        if not isinstance(manifest, dict):
+            raise ArchiveError("manifest.json is not an object")
+        if manifest.get("format") != ARCHIVE_FORMAT or manifest.get("version") != ARCHIVE_VERSION:
+            raise ArchiveError("Unsupported archive format")
+        self.namespace = uuid.uuid5(uuid.UUID(manifest["export_id"]), self.user_id)
+    
+    def create_staging_tables(self):
+        # CREATE TABLE AS copies no constraints, so the NOT NULL columns are
+        # looked up here and checked row by row in add_row
+        for table, columns in IMPORT_COLUMNS:
+            self.conn.execute(
+                f"CREATE TEMP TABLE import_{table} AS SELECT {', '.join(columns)} FROM main.{table} WHERE 0"
+            )
+            not_null = {row[1] for row in self.conn.execute(f"PRAGMA main.table_info({table})") if row[3]}
+            self.required[table] = [i for i, column in enumerate(columns) if column in not_null]
+    
+    def import_blob(self, source, name):
+        # Hash while copying, then keep the file only if this content is not
+        # already stored
+        tmp_path = os.path.join(self.upload_dir, f".import-{uuid.uuid4().hex}.tmp")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as out:
+                while True:
+                    chunk = source.read(ARCHIVE_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    size += len(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        sha256 = digest.hexdigest()
+        self.stats["bytes"] += size
+        
+        if sha256 in self.new_blobs:
+            file_path = self.new_blobs[sha256][0]
+        elif sha256 in self.shared_blobs:
+            file_path = self.shared_blobs[sha256]
+        else:
+            existing = self.conn.execute("SELECT file_path FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+            file_path = existing[0] if existing and os.path.isfile(existing[0]) else None
+            if file_path is not None:
+                # Checked again in commit_staged_rows, under the write lock
+                self.shared_blobs[sha256] = file_path
+        if file_path is not None:
+            os.remove(tmp_path)
+            self.blob_paths[name] = file_path
+            self.stats["blobs_deduplicated"] += 1
+            return
+        
+        file_path = os.path.join(self.upload_dir, f"{uuid.uuid4()}{os.path.splitext(name)[1]}")
+        os.replace(tmp_path, file_path)
+        self.new_blobs[sha256] = (file_path, size)
+        self.blob_paths[name] = file_path
+        self.stats["blobs_stored"] += 1
+    
+    def import_rows(self, source, table):
+        for line in source:
+            if line.strip():
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ArchiveError(f"{table} row is not a JSON object")
+                self.seen_rows[table] += 1
+                self.add_row(table, record)
+    
+    def add_row(self, table, record):
+        if table == "documents":
+            row = (
+                self.new_id(record["id"]), record["title"], self.user_id,
+                self.blob_paths.get(record.get("blob"), ""), record["page_count"], record["created_at"]
+            )
+        elif table == "quizzes":
+            row = (self.new_id(record["id"]), self.new_id(record["document_id"]), record["created_at"])
+        elif table == "quiz_questions":
+            row = (
+                self.new_id(record["id"]), self.new_id(record["quiz_id"]),
+                text_codec.encode("question", record["question"]), record["options"], record["correct_answer"]
+            )
+        elif table == "flashcards":
+            row = (
+                self.new_id(record["id"]), self.new_id(record["document_id"]), record["term"],
+                text_codec.encode("flashcard", record["definition"]), record["created_at"]
+            )
+        elif table == "summaries":
+            row = (
+                self.new_id(record["id"]), self.new_id(record["document_id"]),
+                text_codec.encode("summary", record["content"]), record["created_at"]
+            )
+        else:
+            row = (
+                self.new_id(record["id"]), self.user_id, self.new_id(record["document_id"]),
+                record["quiz_score"], record["flashcards_completed"], record["last_accessed"]
+            )
+        
+        for index in self.required[table]:
+            if row[index] is None:
+                raise ArchiveError(f"{table} row {record.get('id')} has no {dict(IMPORT_COLUMNS)[table][index]}")
+        
+        rows = self.pending.setdefault(table, [])
+        rows.append(row)
+        if len(rows) >= IMPORT_BATCH_ROWS:
+            self.flush()
+    
+    def flush(self):
+        # Batches only go to the staging tables; nothing is visible to other
+        # connections until commit_staged_rows
+        for table, columns in IMPORT_COLUMNS:
+            rows = self.pending.pop(table, None)
+            if rows:
+                placeholders = ", ".join("?" * len(columns))
+                self.conn.executemany(
+                    f"INSERT INTO temp.import_{table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+                )
+                self.stats[table] += len(rows)
+    
+    def commit_staged_rows(self):
+        # One transaction for the blobs and all tables, in archive order so
+        # documents are written no later than the rows pointing at them
+        self.conn.commit()
+        self.conn.execute("BEGIN IMMEDIATE")
+        # delete_document drops a blobs row in the same transaction that
+        # deletes its last document, so a row still present here means the
+        # file stays
+        for sha256, file_path in self.shared_blobs.items():
+            row = self.conn.execute(
+                "SELECT 1 FROM blobs WHERE sha256 = ? AND file_path = ?", (sha256, file_path)
+            ).fetchone()
+            if row is None or not os.path.isfile(file_path):
+                raise ArchiveError("A PDF in this archive was deleted from the library during the import; try again")
+        created_at = datetime.utcnow().isoformat()
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO blobs (sha256, file_path, size, created_at) VALUES (?, ?, ?, ?)",
+            [(sha256, file_path, size, created_at) for sha256, (file_path, size) in self.new_blobs.items()]
+        )
+        for table, columns in IMPORT_COLUMNS:
+            self.conn.execute(
+                f"INSERT INTO main.{table} ({', '.join(columns)}) "
+                f"SELECT {', '.join(columns)} FROM temp.import_{table}"
+            )
+        self.conn.commit()
+    
+    def abort(self):
+        # No other import can know about the files written here: their blobs
+        # rows were never committed
+        self.conn.rollback()
+        for file_path, _ in self.new_blobs.values():
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+def import_library(fileobj, user_id):
+    # Separate connection so the staging tables and the final transaction
+    # stay private to this import
+    conn = db.connect()
+    try:
+        return LibraryImporter(conn, user_id).import_archive(fileobj)
+    finally:
+        conn.close()
+
+# Database instance (EDUPDF_DB_PATH overrides the default app.db)
+db = Database(os.environ.get("EDUPDF_DB_PATH", "app.db"))
+
+# Startup and shutdown work runs here rather than at import time
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db.setup_db()
+    text_codec.load(db.get_connection())
+    yield
+    thumbnail_renderer.shutdown()
+    db.close()
+
 # FastAPI application
-app = FastAPI(title="EduPDF API")
+app = FastAPI(title="EduPDF API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -317,9 +1193,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Database instance
-db = Database()
-
 # Health check endpoint
 @app.get("/health")
 def health_check():
@@ -327,12 +1200,11 @@ def health_check():
 
 # Authentication endpoints
 @app.post("/register", response_model=UserResponse)
-def register_user(user: UserCreate):
-    conn = db.get_connection()
+def register_user(user: UserCreate, conn: sqlite3.Connection = Depends(get_db)):
     cursor = conn.cursor()
     
     # Check if user already exists
-    existing_user = get_user_by_email(cursor, user.email)
+    existing_user = get_user_by_email(conn, user.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -358,9 +1230,11 @@ def register_user(user: UserCreate):
     }
 
 @app.post("/token", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    conn = db.get_connection()
-    user = authenticate_user(conn.cursor(), form_data.username, form_data.password)
+def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    conn: sqlite3.Connection = Depends(get_db)
+):
+    user = authenticate_user(conn, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -378,9 +1252,11 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
 # Document endpoints
 @app.post("/documents", response_model=DocumentResponse)
 async def create_document(
+    background_tasks: BackgroundTasks,
     title: str = Form(...),
     file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_db)
 ):
     # Create uploads directory if it doesn't exist
     upload_dir = "uploads"
@@ -398,7 +1274,6 @@ async def create_document(
     page_count = 10  # Dummy value
     
     # Save document to database
-    conn = db.get_connection()
     cursor = conn.cursor()
     
     document_id = str(uuid.uuid4())
@@ -410,6 +1285,10 @@ async def create_document(
     )
     conn.commit()
     
+    # Warm the preview cache once the response has been sent
+    if THUMBNAIL_PRERENDER_PAGES > 0:
+        background_tasks.add_task(thumbnail_renderer.prerender, document_id, file_path, page_count)
+    
     return {
         "id": document_id,
         "title": title,
@@ -418,8 +1297,10 @@ async def create_document(
     }
 
 @app.get("/documents", response_model=List[DocumentResponse])
-def get_user_documents(current_user: dict = Depends(get_current_user)):
-    conn = db.get_connection()
+def get_user_documents(
+    current_user: dict = Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_db)
+):
     cursor = conn.cursor()
     
     cursor.execute(
@@ -439,8 +1320,11 @@ def get_user_documents(current_user: dict = Depends(get_current_user)):
     ]
 
 @app.get("/documents/{document_id}", response_model=DocumentResponse)
-def get_document(document_id: str, current_user: dict = Depends(get_current_user)):
-    conn = db.get_connection()
+def get_document(
+    document_id: str,
+    current_user: dict = Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_db)
+):
     cursor = conn.cursor()
     
     cursor.execute(
@@ -463,10 +1347,17 @@ def get_document(document_id: str, current_user: dict = Depends(get_current_user
     }
 
 @app.delete("/documents/{document_id}")
-def delete_document(document_id: str, current_user: dict = Depends(get_current_user)):
-    conn = db.get_connection()
+def delete_document(
+    document_id: str,
+    current_user: dict = Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_db)
+):
     cursor = conn.cursor()
     
+    # Take the write lock before checking who else uses the file, so an
+    # import cannot start sharing it between the check and the delete (see
+    # LibraryImporter.commit_staged_rows)
+    cursor.execute("BEGIN IMMEDIATE")
     cursor.execute(
         "SELECT * FROM documents WHERE id = ? AND user_id = ?",
         (document_id, current_user["id"])
@@ -479,9 +1370,16 @@ def delete_document(document_id: str, current_user: dict = Depends(get_current_u
             detail="Document not found"
         )
     
-    # Delete file
-    if os.path.exists(document["file_path"]):
-        os.remove(document["file_path"])
+    # The file goes once the rows are committed, unless another document
+    # shares it (imports deduplicate identical PDFs)
+    cursor.execute(
+        "SELECT COUNT(*) FROM documents WHERE file_path = ? AND id != ?",
+        (document["file_path"], document_id)
+    )
+    remove_file = cursor.fetchone()[0] == 0
+    if remove_file:
+        cursor.execute("DELETE FROM blobs WHERE file_path = ?", (document["file_path"],))
+    thumbnail_renderer.cache.discard_document(document_id)
     
     # Delete document and related data
     cursor.execute("DELETE FROM study_progress WHERE document_id = ?", (document_id,))
@@ -500,12 +1398,82 @@ def delete_document(document_id: str, current_user: dict = Depends(get_current_u
     
     conn.commit()
     
+    if remove_file and os.path.exists(document["file_path"]):
+        os.remove(document["file_path"])
+    
     return {"message": "Document deleted successfully"}
 
+@app.get("/documents/{document_id}/pages/{page_number}/thumbnail")
+async def get_page_thumbnail(
+    document_id: str,
+    page_number: int,
+    width: int = Query(THUMBNAIL_WIDTH, ge=50, le=THUMBNAIL_MAX_WIDTH),
+    current_user: dict = Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_db)
+):
+    # The handler is async so it can await the render; the lookup runs in the
+    # threadpool like the sync handlers' queries
+    def find_document():
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM documents WHERE id = ? AND user_id = ?",
+            (document_id, current_user["id"])
+        )
+        return cursor.fetchone()
+    
+    document = await run_in_threadpool(find_document)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    if not 1 <= page_number <= document["page_count"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Page not found"
+        )
+    
+    try:
+        data = await thumbnail_renderer.get_thumbnail(
+            document_id, document["file_path"], page_number, width
+        )
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Thumbnail rendering is not available"
+        )
+    except BrokenProcessPool:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Thumbnail renderer failed, try again later"
+        )
+    except IndexError:
+        # page_count is not always accurate for the stored file
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Page not found"
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document file is missing or not a readable PDF"
+        )
+    
+    return Response(
+        content=data,
+        media_type="image/jpeg",
+        headers={"Cache-Control": "private, max-age=86400"}
+    )
+
 # Content generation endpoints
 @app.post("/documents/{document_id}/quiz", response_model=QuizResponse)
-def create_quiz(document_id: str, current_user: dict = Depends(get_current_user)):
-    conn = db.get_connection()
+def create_quiz(
+    document_id: str,
+    current_user: dict = Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_db)
+):
     cursor = conn.cursor()
     
     cursor.execute(
@@ -540,7 +1508,7 @@ def create_quiz(document_id: str, current_user: dict = Depends(get_current_user)
         question_id = str(uuid.uuid4())
         cursor.execute(
             "INSERT INTO quiz_questions (id, quiz_id, question, options, correct_answer) VALUES (?, ?, ?, ?, ?)",
-            (question_id, quiz_id, q["question"], ",".join(q["options"]), q["correct_answer"])
+            (question_id, quiz_id, text_codec.encode("question", q["question"]), ",".join(q["options"]), q["correct_answer"])
         )
         
         question_responses.append({
@@ -559,8 +1527,11 @@ def create_quiz(document_id: str, current_user: dict = Depends(get_current_user)
     }
 
 @app.post("/documents/{document_id}/flashcards", response_model=List[FlashcardResponse])
-def create_flashcards(document_id: str, current_user: dict = Depends(get_current_user)):
-    conn = db.get_connection()
+def create_flashcards(
+    document_id: str,
+    current_user: dict = Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_db)
+):
     cursor = conn.cursor()
     
     cursor.execute(
@@ -589,7 +1560,7 @@ def create_flashcards(document_id: str, current_user: dict = Depends(get_current
         flashcard_id = str(uuid.uuid4())
         cursor.execute(
             "INSERT INTO flashcards (id, document_id, term, definition, created_at) VALUES (?, ?, ?, ?, ?)",
-            (flashcard_id, document_id, fc["term"], fc["definition"], created_at)
+            (flashcard_id, document_id, fc["term"], text_codec.encode("flashcard", fc["definition"]), created_at)
         )
         
         flashcard_responses.append({
@@ -604,8 +1575,11 @@ def create_flashcards(document_id: str, current_user: dict = Depends(get_current
     return flashcard_responses
 
 @app.post("/documents/{document_id}/summary", response_model=SummaryResponse)
-def create_summary(document_id: str, current_user: dict = Depends(get_current_user)):
-    conn = db.get_connection()
+def create_summary(
+    document_id: str,
+    current_user: dict = Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_db)
+):
     cursor = conn.cursor()
     
     cursor.execute(
@@ -632,7 +1606,7 @@ def create_summary(document_id: str, current_user: dict = Depends(get_current_us
     
     cursor.execute(
         "INSERT INTO summaries (id, document_id, content, created_at) VALUES (?, ?, ?, ?)",
-        (summary_id, document_id, summary_content, created_at)
+        (summary_id, document_id, text_codec.encode("summary", summary_content), created_at)
     )
     conn.commit()
     
@@ -648,9 +1622,9 @@ def update_study_progress(
     document_id: str,
     quiz_score: Optional[float] = None,
     flashcards_completed: Optional[int] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_db)
 ):
-    conn = db.get_connection()
     cursor = conn.cursor()
     
     cursor.execute(
@@ -709,8 +1683,11 @@ def update_study_progress(
     return {"message": "Progress updated successfully"}
 
 @app.get("/documents/{document_id}/progress", response_model=StudyProgressResponse)
-def get_study_progress(document_id: str, current_user: dict = Depends(get_current_user)):
-    conn = db.get_connection()
+def get_study_progress(
+    document_id: str,
+    current_user: dict = Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_db)
+):
     cursor = conn.cursor()
     
     cursor.execute(
@@ -733,6 +1710,33 @@ def get_study_progress(document_id: str, current_user: dict = Depends(get_curren
         "last_accessed": progress["last_accessed"]
     }
 
+# Library export and import endpoints
+@app.get("/export")
+def export_library(current_user: dict = Depends(get_current_user)):
+    filename = f"edupdf-export-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.tar"
+    return StreamingResponse(
+        stream_library_export(current_user),
+        media_type="application/x-tar",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.post("/import")
+async def import_library_archive(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    # The upload is already spooled to disk by the multipart parser; the
+    # archive is read from there in a worker thread
+    try:
+        stats = await run_in_threadpool(import_library, file.file, current_user["id"])
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    return {"message": "Library imported successfully", "imported": stats}
+
 # Simplified API for demo purposes
 @app.get("/pdf/")
 def list_pdfs():
@@ -749,5 +1753,11 @@ def list_pdfs():
 
 # Run the application
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    import sys
+    if sys.argv[1:2] == ["compress-text"]:
+        # One-off migration: python backend.py compress-text [--vacuum]
+        db.setup_db()
+        print(compress_existing_text(db.get_connection(), vacuum="--vacuum" in sys.argv))
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8000)
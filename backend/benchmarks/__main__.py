@@ -0,0 +1,130 @@
+# Command line entry point: python -m benchmarks {run,startup,compression,archive,compare}
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from .archive import run_archive
+from .compression import run_compression
+from .harness import SCENARIOS, TRANSPORTS, compare_reports, run_benchmark
+from .startup import run_startup
+
+
+def write_json(data, path):
+    text = json.dumps(data, indent=2, sort_keys=True)
+    if path in (None, "-"):
+        print(text)
+    else:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="EduPDF API benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="seed a synthetic database and drive every endpoint")
+    run.add_argument("--users", type=int, default=10)
+    run.add_argument("--documents", type=int, default=20, help="documents per user")
+    run.add_argument("--pages", type=int, default=10, help="pages per synthetic PDF")
+    run.add_argument("--questions", type=int, default=5, help="questions per seeded quiz")
+    run.add_argument("--flashcards", type=int, default=10, help="flashcards per seeded document")
+    run.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    run.add_argument("--auth-requests", type=int, default=20,
+                     help="requests for the bcrypt-bound /register and /token endpoints")
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--transport", default="asgi,socket",
+                     help=f"comma separated subset of {','.join(TRANSPORTS)}")
+    run.add_argument("--only", default="",
+                     help=f"comma separated subset of {','.join(name for name, _, _ in SCENARIOS)}")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--workdir", default=None, help="empty directory for app.db and uploads/")
+    run.add_argument("--output", default="-", help="report path, '-' for stdout")
+
+    startup = commands.add_parser("startup", help="measure import time and first-request latency")
+    startup.add_argument("--runs", type=int, default=5, help="fresh interpreters to take the median over")
+    startup.add_argument("--top", type=int, default=15, help="heaviest top-level imports to list")
+    startup.add_argument("--output", default="-", help="report path, '-' for stdout")
+
+    compression = commands.add_parser("compression", help="database size and text latency before/after compression")
+    compression.add_argument("--pages", type=int, default=100000, help="synthetic pages stored as summaries")
+    compression.add_argument("--words", type=int, default=350, help="words per page")
+    compression.add_argument("--reads", type=int, default=5000, help="random point reads to time")
+    compression.add_argument("--writes", type=int, default=5000, help="additional rows to time writes with")
+    compression.add_argument("--batch", type=int, default=1000, help="rows per commit")
+    compression.add_argument("--seed", type=int, default=0)
+    compression.add_argument("--workdir", default=None, help="directory for the two databases")
+    compression.add_argument("--output", default="-", help="report path, '-' for stdout")
+
+    archive = commands.add_parser("archive", help="export/import throughput of a synthetic library")
+    archive.add_argument("--documents", type=int, default=200, help="documents in the exported library")
+    archive.add_argument("--blob-kb", type=int, default=1024, help="size of each PDF")
+    archive.add_argument("--duplicate-ratio", type=float, default=0.1,
+                         help="share of documents whose PDF repeats an earlier one")
+    archive.add_argument("--flashcards", type=int, default=10, help="flashcards per document")
+    archive.add_argument("--seed", type=int, default=0)
+    archive.add_argument("--workdir", default=None, help="empty directory for app.db, uploads/ and the archive")
+    archive.add_argument("--output", default="-", help="report path, '-' for stdout")
+
+    compare = commands.add_parser("compare", help="diff two reports produced by 'run' or 'startup'")
+    compare.add_argument("base")
+    compare.add_argument("head")
+    compare.add_argument("--output", default="-")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.head) as f:
+            head = json.load(f)
+        write_json(compare_reports(base, head), args.output)
+        return 0
+
+    if args.command == "compression":
+        write_json(run_compression(
+            pages=args.pages, words=args.words, reads=args.reads, writes=args.writes,
+            batch=args.batch, seed=args.seed, workdir=args.workdir,
+        ), args.output)
+        return 0
+
+    if args.command == "archive":
+        output = args.output if args.output == "-" else os.path.abspath(args.output)
+        write_json(run_archive(
+            documents=args.documents, blob_kb=args.blob_kb, duplicate_ratio=args.duplicate_ratio,
+            flashcards=args.flashcards, seed=args.seed, workdir=args.workdir,
+        ), output)
+        return 0
+
+    if args.command == "startup":
+        write_json(run_startup(runs=args.runs, top=args.top), args.output)
+        return 0
+
+    transports = [t for t in args.transport.split(",") if t]
+    unknown = [t for t in transports if t not in TRANSPORTS]
+    if unknown:
+        parser.error(f"unknown transport(s): {', '.join(unknown)}")
+
+    output = args.output if args.output == "-" else os.path.abspath(args.output)
+    config = {
+        "users": args.users,
+        "documents": args.documents,
+        "pages": args.pages,
+        "questions": args.questions,
+        "flashcards": args.flashcards,
+        "requests": args.requests,
+        "auth_requests": args.auth_requests,
+        "concurrency": args.concurrency,
+        "transports": transports,
+        "only": [name for name in args.only.split(",") if name],
+        "seed": args.seed,
+        "workdir": args.workdir or tempfile.mkdtemp(prefix="edupdf-bench-"),
+    }
+    write_json(run_benchmark(config), output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
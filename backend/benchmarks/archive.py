@@ -0,0 +1,128 @@
+# Throughput of streamed library export and import
+
+import asyncio
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+
+from .harness import BACKEND_DIR, git_commit, login_users, peak_rss_kb, serve_in_thread
+from .seed import make_pdf, seed_database
+
+
+def write_blobs(conn, user, upload_dir, blob_kb, duplicate_ratio, seed):
+    # Give every seeded document its own file of roughly blob_kb, except a
+    # duplicate_ratio share that reuses an earlier file's bytes under a new
+    # name, which the import side should deduplicate
+    rng = random.Random(seed)
+    base = make_pdf(10, seed=seed)
+    total = 0
+    previous = None
+    for i, document_id in enumerate(user["documents"]):
+        if previous is not None and rng.random() < duplicate_ratio:
+            data = previous
+        else:
+            padding = max(0, blob_kb * 1024 - len(base))
+            data = base + b"%" + rng.randbytes(padding) + b"\n"
+            previous = data
+        path = os.path.join(upload_dir, f"archive-{i}.pdf")
+        with open(path, "wb") as f:
+            f.write(data)
+        total += len(data)
+        conn.execute("UPDATE documents SET file_path = ? WHERE id = ?", (path, document_id))
+    conn.commit()
+    return total
+
+
+async def export_and_import(app, users, archive_path):
+    async with serve_in_thread(app) as base_url:
+        async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+            await login_users(client, users)
+            source, target = users
+
+            # Export: stream the body straight to disk
+            rss_before = peak_rss_kb()
+            started = time.perf_counter()
+            archive_bytes = 0
+            async with client.stream(
+                "GET", "/export", headers={"Authorization": f"Bearer {source['token']}"}
+            ) as response:
+                response.raise_for_status()
+                with open(archive_path, "wb") as f:
+                    async for chunk in response.aiter_bytes():
+                        archive_bytes += len(chunk)
+                        f.write(chunk)
+            export_s = time.perf_counter() - started
+            export_rss = peak_rss_kb()
+
+            # Import into the second user; httpx streams the file from disk
+            started = time.perf_counter()
+            with open(archive_path, "rb") as f:
+                response = await client.post(
+                    "/import",
+                    headers={"Authorization": f"Bearer {target['token']}"},
+                    files={"file": ("library.tar", f, "application/x-tar")},
+                )
+            response.raise_for_status()
+            import_s = time.perf_counter() - started
+            import_rss = peak_rss_kb()
+
+    mb = archive_bytes / (1024 * 1024)
+    return {
+        "archive_bytes": archive_bytes,
+        "export": {
+            "elapsed_s": round(export_s, 3),
+            "mb_per_s": round(mb / export_s, 2),
+            "peak_rss_kb_before": rss_before,
+            "peak_rss_kb_after": export_rss,
+        },
+        "import": {
+            "elapsed_s": round(import_s, 3),
+            "mb_per_s": round(mb / import_s, 2),
+            "peak_rss_kb_after": import_rss,
+            "imported": response.json()["imported"],
+        },
+    }
+
+
+def run_archive(documents=200, blob_kb=1024, duplicate_ratio=0.1, flashcards=10, seed=0, workdir=None):
+    workdir = workdir or tempfile.mkdtemp(prefix="edupdf-archive-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    if os.path.exists("app.db"):
+        raise RuntimeError(f"{workdir} already contains app.db; use an empty work directory")
+
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    import backend
+
+    backend.db.setup_db()
+    conn = backend.db.get_connection()
+    # The first user owns the library, the second one imports it
+    users = seed_database(
+        conn, users=2, documents_per_user=documents, flashcards_per_document=flashcards, seed=seed
+    )
+    users[1]["documents"] = users[1]["documents"][:1]
+    blob_bytes = write_blobs(conn, users[0], "uploads", blob_kb, duplicate_ratio, seed)
+    backend.text_codec.load(conn)
+
+    results = asyncio.run(export_and_import(backend.app, users, os.path.join(workdir, "library.tar")))
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "documents": documents, "blob_kb": blob_kb, "duplicate_ratio": duplicate_ratio,
+                "flashcards": flashcards, "seed": seed,
+            },
+        },
+        "library_blob_bytes": blob_bytes,
+        **results,
+    }
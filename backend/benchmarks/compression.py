@@ -0,0 +1,122 @@
+# Database size and text read/write latency with and without compression
+
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from .harness import BACKEND_DIR, db_bytes, git_commit, percentile
+from .seed import TextCorpus
+
+
+def latency_summary(seconds):
+    values = sorted(s * 1000.0 for s in seconds)
+    return {
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+    }
+
+
+def write_pages(conn, corpus, encode, first, count, words, batch):
+    # Times encode + INSERT for every row; commits are included in the
+    # overall rate but not in the per-row latencies. Generating the text is
+    # excluded from both.
+    latencies = []
+    elapsed = 0.0
+    for i in range(first, first + count):
+        text = corpus.page(course=i // 500, page_number=i % 500, words=words)
+        row_started = time.perf_counter()
+        conn.execute(
+            "INSERT INTO summaries (id, document_id, content, created_at) VALUES (?, ?, ?, ?)",
+            (f"page-{i}", f"document-{i // 500}", encode("summary", text), "2024-01-01T00:00:00")
+        )
+        row_done = time.perf_counter()
+        latencies.append(row_done - row_started)
+        if (i - first + 1) % batch == 0 or i == first + count - 1:
+            conn.commit()
+        elapsed += time.perf_counter() - row_started
+    return {"rows": count, "rows_per_s": round(count / elapsed, 1), "latency_ms": latency_summary(latencies)}
+
+
+def read_pages(conn, decode, pages, reads, seed):
+    rng = random.Random(seed)
+    latencies = []
+    total_chars = 0
+    for _ in range(reads):
+        page_id = f"page-{rng.randrange(pages)}"
+        started = time.perf_counter()
+        row = conn.execute("SELECT content FROM summaries WHERE id = ?", (page_id,)).fetchone()
+        text = decode(row[0])
+        latencies.append(time.perf_counter() - started)
+        total_chars += len(text)
+    return {"reads": reads, "chars": total_chars, "latency_ms": latency_summary(latencies)}
+
+
+def run_compression(pages=100000, words=350, reads=5000, writes=5000, batch=1000, seed=0, workdir=None):
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    import backend
+
+    workdir = workdir or tempfile.mkdtemp(prefix="edupdf-compression-")
+    plain_path = os.path.join(workdir, "plain.db")
+    compressed_path = os.path.join(workdir, "compressed.db")
+
+    def identity(artifact, text):
+        return text
+
+    # Before: every page stored as plain TEXT
+    plain = backend.Database(plain_path)
+    plain.setup_db()
+    conn = plain.get_connection()
+    write_pages(conn, TextCorpus(seed), identity, 0, pages, words, batch)
+    before = {"db_bytes": db_bytes(conn, plain_path)}
+    before["read"] = read_pages(conn, lambda value: value, pages, reads, seed)
+    plain.close()
+
+    # Migration on a copy of the plain database; db_bytes checkpointed the
+    # WAL, so the main file alone is the whole database
+    shutil.copyfile(plain_path, compressed_path)
+    compressed = backend.Database(compressed_path)
+    conn = compressed.get_connection()
+    started = time.perf_counter()
+    migrated = backend.compress_existing_text(conn, batch_size=batch, vacuum=True)
+    migration = {"elapsed_s": round(time.perf_counter() - started, 3), "rows_compressed": migrated}
+
+    after = {"db_bytes": db_bytes(conn, compressed_path)}
+    after["read"] = read_pages(conn, backend.text_codec.decode, pages, reads, seed)
+    compressed.close()
+
+    # Writes of new pages, measured after the reads so both databases are
+    # the same size when they start
+    corpus = TextCorpus(seed + 1)
+    plain = backend.Database(plain_path)
+    before["write"] = write_pages(plain.get_connection(), corpus, identity, pages, writes, words, batch)
+    plain.close()
+    corpus = TextCorpus(seed + 1)
+    compressed = backend.Database(compressed_path)
+    after["write"] = write_pages(
+        compressed.get_connection(), corpus, backend.text_codec.encode, pages, writes, words, batch
+    )
+    compressed.close()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {"pages": pages, "words": words, "reads": reads, "writes": writes, "batch": batch, "seed": seed},
+        },
+        "codec": "zstd" if backend.text_codec.zstd is not None else "zlib",
+        "before": before,
+        "migration": migration,
+        "after": after,
+        "size_ratio": round(after["db_bytes"] / before["db_bytes"], 4),
+        "workdir": workdir,
+    }
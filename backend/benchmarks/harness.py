@@ -0,0 +1,384 @@
+# Load generator and reporting for the EduPDF API
+
+import asyncio
+import contextlib
+import math
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+
+from .seed import BENCH_PASSWORD, make_pdf, seed_database
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile; sorted_values must already be sorted
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def peak_rss_kb():
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        usage //= 1024
+    return usage
+
+
+def db_bytes(conn, path):
+    # The database runs in WAL mode, so recent pages (and the output of a
+    # VACUUM) may still sit in the -wal file; fold them into the main file
+    # before measuring it
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(path)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Benchmark state shared by the scenarios of one transport run
+class BenchState:
+    def __init__(self, users, pdf_bytes, pages, seed=0):
+        self.users = users
+        self.pdf_bytes = pdf_bytes
+        self.pages = pages
+        self.rng = random.Random(seed)
+        self.created_documents = []
+
+    def pick_user(self):
+        return self.rng.choice(self.users)
+
+    def pick_document(self):
+        user = self.pick_user()
+        return user, self.rng.choice(user["documents"])
+
+
+def auth_headers(user):
+    return {"Authorization": f"Bearer {user['token']}"}
+
+
+# Scenarios: each sends one request and returns the response
+async def scenario_health(client, state):
+    return await client.get("/health")
+
+
+async def scenario_pdf_list(client, state):
+    return await client.get("/pdf/")
+
+
+async def scenario_register(client, state):
+    suffix = uuid.uuid4().hex
+    return await client.post(
+        "/register",
+        json={"email": f"new-{suffix}@example.com", "username": suffix, "password": BENCH_PASSWORD},
+    )
+
+
+async def scenario_token(client, state):
+    user = state.pick_user()
+    return await client.post("/token", data={"username": user["email"], "password": BENCH_PASSWORD})
+
+
+async def scenario_document_upload(client, state):
+    user = state.pick_user()
+    response = await client.post(
+        "/documents",
+        headers=auth_headers(user),
+        data={"title": "Benchmark upload"},
+        files={"file": ("bench.pdf", state.pdf_bytes, "application/pdf")},
+    )
+    if response.status_code == 200:
+        state.created_documents.append((user, response.json()["id"]))
+    return response
+
+
+async def scenario_documents_list(client, state):
+    user = state.pick_user()
+    return await client.get("/documents", headers=auth_headers(user))
+
+
+async def scenario_document_get(client, state):
+    user, document_id = state.pick_document()
+    return await client.get(f"/documents/{document_id}", headers=auth_headers(user))
+
+
+async def scenario_page_thumbnail(client, state):
+    # Mostly cache hits after the first pass over the seeded documents
+    user, document_id = state.pick_document()
+    page_number = state.rng.randrange(1, state.pages + 1)
+    return await client.get(f"/documents/{document_id}/pages/{page_number}/thumbnail", headers=auth_headers(user))
+
+
+async def scenario_quiz_create(client, state):
+    user, document_id = state.pick_document()
+    return await client.post(f"/documents/{document_id}/quiz", headers=auth_headers(user))
+
+
+async def scenario_flashcards_create(client, state):
+    user, document_id = state.pick_document()
+    return await client.post(f"/documents/{document_id}/flashcards", headers=auth_headers(user))
+
+
+async def scenario_summary_create(client, state):
+    user, document_id = state.pick_document()
+    return await client.post(f"/documents/{document_id}/summary", headers=auth_headers(user))
+
+
+async def scenario_progress_update(client, state):
+    user, document_id = state.pick_document()
+    return await client.post(
+        f"/documents/{document_id}/progress",
+        headers=auth_headers(user),
+        params={"quiz_score": round(state.rng.random() * 100, 2), "flashcards_completed": state.rng.randrange(10)},
+    )
+
+
+async def scenario_progress_get(client, state):
+    user, document_id = state.pick_document()
+    return await client.get(f"/documents/{document_id}/progress", headers=auth_headers(user))
+
+
+async def scenario_document_delete(client, state):
+    # Only deletes documents uploaded earlier in the run, never seeded ones
+    if not state.created_documents:
+        return None
+    user, document_id = state.created_documents.pop()
+    return await client.delete(f"/documents/{document_id}", headers=auth_headers(user))
+
+
+# (name, scenario, uses bcrypt) in execution order. Uploads run before
+# deletes so the delete scenario has documents to consume.
+SCENARIOS = [
+    ("health", scenario_health, False),
+    ("pdf_list", scenario_pdf_list, False),
+    ("register", scenario_register, True),
+    ("token", scenario_token, True),
+    ("document_upload", scenario_document_upload, False),
+    ("documents_list", scenario_documents_list, False),
+    ("document_get", scenario_document_get, False),
+    ("page_thumbnail", scenario_page_thumbnail, False),
+    ("quiz_create", scenario_quiz_create, False),
+    ("flashcards_create", scenario_flashcards_create, False),
+    ("summary_create", scenario_summary_create, False),
+    ("progress_update", scenario_progress_update, False),
+    ("progress_get", scenario_progress_get, False),
+    ("document_delete", scenario_document_delete, False),
+]
+
+
+async def run_scenario(client, state, scenario, requests, concurrency):
+    latencies = []
+    status_codes = {}
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await scenario(client, state)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            if response is None:
+                return
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            code = str(response.status_code)
+            status_codes[code] = status_codes.get(code, 0) + 1
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(round(ms, 3) for ms in latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "status_codes": status_codes,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
+
+
+async def login_users(client, users):
+    for user in users:
+        response = await client.post("/token", data={"username": user["email"], "password": BENCH_PASSWORD})
+        response.raise_for_status()
+        user["token"] = response.json()["access_token"]
+
+
+async def run_transport(client, users, config):
+    pdf_bytes = make_pdf(config["pages"], seed=config["seed"])
+    state = BenchState(users, pdf_bytes, config["pages"], seed=config["seed"])
+    await login_users(client, users)
+
+    results = {}
+    for name, scenario, uses_bcrypt in SCENARIOS:
+        if config["only"] and name not in config["only"]:
+            continue
+        requests = config["auth_requests"] if uses_bcrypt else config["requests"]
+        results[name] = await run_scenario(client, state, scenario, requests, config["concurrency"])
+    return results
+
+
+async def run_asgi(app, users, config):
+    # Unhandled exceptions become 500s, as they would behind a real server
+    # ASGITransport does not send lifespan events, so run the app's own
+    # startup and shutdown around the client
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_transport(client, users, config)
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.asynccontextmanager
+async def serve_in_thread(app):
+    # Real uvicorn server on a free local port; yields its base URL
+    import uvicorn
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn server failed to start")
+        await asyncio.sleep(0.01)
+
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+async def run_socket(app, users, config):
+    async with serve_in_thread(app) as base_url:
+        limits = httpx.Limits(max_connections=config["concurrency"])
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+            return await run_transport(client, users, config)
+
+
+TRANSPORTS = {"asgi": run_asgi, "socket": run_socket}
+
+
+def run_benchmark(config):
+    # The app resolves app.db and uploads/ relative to the working directory,
+    # so everything happens inside the (fresh) work directory
+    commit = git_commit()
+    workdir = config["workdir"]
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    if os.path.exists("app.db"):
+        raise RuntimeError(f"{workdir} already contains app.db; use an empty work directory")
+
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    import backend
+
+    seed_started = time.perf_counter()
+    backend.db.setup_db()
+    users = seed_database(
+        backend.db.get_connection(),
+        users=config["users"],
+        documents_per_user=config["documents"],
+        pages_per_document=config["pages"],
+        questions_per_quiz=config["questions"],
+        flashcards_per_document=config["flashcards"],
+        seed=config["seed"],
+    )
+    seed_elapsed = time.perf_counter() - seed_started
+
+    transports = {}
+    for name in config["transports"]:
+        transports[name] = asyncio.run(TRANSPORTS[name](backend.app, users, config))
+
+    return {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {k: v for k, v in config.items() if k != "workdir"},
+        },
+        "seed": {
+            "users": config["users"],
+            "documents": config["users"] * config["documents"],
+            "elapsed_s": round(seed_elapsed, 4),
+            "db_bytes": db_bytes(backend.db.get_connection(), "app.db"),
+        },
+        "transports": transports,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def compare_reports(base, head):
+    # Relative change of throughput and tail latency for every endpoint that
+    # appears in both reports; positive latency deltas are regressions
+    def delta(old, new):
+        if old in (None, 0) or new is None:
+            return None
+        return round((new - old) / old * 100.0, 2)
+
+    comparison = {}
+    for transport, endpoints in head.get("transports", {}).items():
+        base_endpoints = base.get("transports", {}).get(transport, {})
+        for name, stats in endpoints.items():
+            if name not in base_endpoints:
+                continue
+            old = base_endpoints[name]
+            comparison.setdefault(transport, {})[name] = {
+                "throughput_rps_pct": delta(old["throughput_rps"], stats["throughput_rps"]),
+                "p50_pct": delta(old["latency_ms"]["p50"], stats["latency_ms"]["p50"]),
+                "p95_pct": delta(old["latency_ms"]["p95"], stats["latency_ms"]["p95"]),
+                "p99_pct": delta(old["latency_ms"]["p99"], stats["latency_ms"]["p99"]),
+            }
+    # Reports from 'startup' carry timings instead of per-endpoint stats
+    startup = {}
+    for key, value in head.get("startup", {}).items():
+        if key.endswith("_ms") and key in base.get("startup", {}):
+            startup[f"{key}_pct"] = delta(base["startup"][key], value)
+
+    return {
+        "base_commit": base["meta"].get("commit"),
+        "head_commit": head["meta"].get("commit"),
+        "peak_rss_kb_pct": delta(base.get("peak_rss_kb"), head.get("peak_rss_kb")),
+        "transports": comparison,
+        "startup": startup,
+    }
@@ -0,0 +1,176 @@
+# Synthetic data for the EduPDF benchmark harness
+
+import itertools
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from passlib.context import CryptContext
+
+BENCH_PASSWORD = "benchmark-password"
+
+
+def make_pdf(page_count, seed=0):
+    # Build a minimal, valid PDF with one line of text per page. Written by
+    # hand so the harness does not need a PDF library to produce fixtures.
+    rng = random.Random(seed)
+    objects = []
+
+    page_ids = [3 + i * 2 for i in range(page_count)]
+    font_id = 3 + page_count * 2
+
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {page_count} >>".encode())
+
+    for i, pid in enumerate(page_ids):
+        words = " ".join(f"w{rng.randrange(10000)}" for _ in range(12))
+        stream = f"BT /F1 12 Tf 72 720 Td (Page {i + 1}: {words}) Tj ET".encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {pid + 1} 0 R >>".encode()
+        )
+        objects.append(
+            b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream"
+        )
+
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    xref_offset = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref_offset}\n%%EOF\n"
+    ).encode()
+    return bytes(out)
+
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ra", "su", "ti", "ve", "do", "ph", "an", "ex", "ion", "ing", "al"]
+
+
+class TextCorpus:
+    # Page-sized text with a Zipf-distributed vocabulary and recurring
+    # headings, so it compresses roughly like extracted course material
+    # rather than like random bytes
+    def __init__(self, seed=0, vocabulary=5000):
+        self.rng = random.Random(seed)
+        words = set()
+        while len(words) < vocabulary:
+            words.add("".join(self.rng.choice(SYLLABLES) for _ in range(self.rng.randint(1, 4))))
+        self.words = sorted(words)
+        self.rng.shuffle(self.words)
+        self.cum_weights = list(itertools.accumulate(1.0 / rank for rank in range(1, len(self.words) + 1)))
+
+    def sentence(self):
+        words = self.rng.choices(self.words, cum_weights=self.cum_weights, k=self.rng.randint(8, 20))
+        return " ".join(words).capitalize() + "."
+
+    def page(self, course, page_number, words=350):
+        lines = [f"Course {course} - Chapter {page_number // 20 + 1} - Page {page_number}"]
+        count = 0
+        while count < words:
+            sentence = self.sentence()
+            count += sentence.count(" ") + 1
+            lines.append(sentence)
+        return "\n".join(lines)
+
+
+def seed_database(
+    conn,
+    upload_dir="uploads",
+    users=10,
+    documents_per_user=20,
+    pages_per_document=10,
+    quizzes_per_document=1,
+    questions_per_quiz=5,
+    flashcards_per_document=10,
+    summaries_per_document=1,
+    seed=0,
+):
+    # Populate an already created schema with synthetic rows. All users share
+    # BENCH_PASSWORD so the harness can log in as any of them; the hash is
+    # computed once because bcrypt dominates seeding time otherwise.
+    rng = random.Random(seed)
+    os.makedirs(upload_dir, exist_ok=True)
+
+    hashed_password = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(BENCH_PASSWORD)
+    now = datetime.utcnow()
+
+    # Documents of the same size share one file on disk
+    pdf_path = os.path.join(upload_dir, f"bench-{pages_per_document}p.pdf")
+    with open(pdf_path, "wb") as f:
+        f.write(make_pdf(pages_per_document, seed=seed))
+
+    cursor = conn.cursor()
+    user_rows = []
+    for u in range(users):
+        user_id = str(uuid.uuid4())
+        created_at = (now - timedelta(days=rng.randrange(365))).isoformat()
+        cursor.execute(
+            "INSERT INTO users (id, email, username, hashed_password, created_at) VALUES (?, ?, ?, ?, ?)",
+            (user_id, f"bench{u}@example.com", f"bench{u}", hashed_password, created_at)
+        )
+        user_rows.append({"id": user_id, "email": f"bench{u}@example.com", "documents": []})
+
+        for d in range(documents_per_user):
+            document_id = str(uuid.uuid4())
+            doc_created = (now - timedelta(minutes=rng.randrange(100000))).isoformat()
+            cursor.execute(
+                "INSERT INTO documents (id, title, user_id, file_path, page_count, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (document_id, f"Document {u}-{d}", user_id, pdf_path, pages_per_document, doc_created)
+            )
+            user_rows[-1]["documents"].append(document_id)
+
+            for _ in range(quizzes_per_document):
+                quiz_id = str(uuid.uuid4())
+                cursor.execute(
+                    "INSERT INTO quizzes (id, document_id, created_at) VALUES (?, ?, ?)",
+                    (quiz_id, document_id, doc_created)
+                )
+                cursor.executemany(
+                    "INSERT INTO quiz_questions (id, quiz_id, question, options, correct_answer) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            str(uuid.uuid4()), quiz_id, f"Question {q} about document {u}-{d}?",
+                            ",".join(f"Option {o}" for o in range(4)), rng.randrange(4)
+                        )
+                        for q in range(questions_per_quiz)
+                    ]
+                )
+
+            cursor.executemany(
+                "INSERT INTO flashcards (id, document_id, term, definition, created_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        str(uuid.uuid4()), document_id, f"Term {c}",
+                        f"Definition {c} for document {u}-{d}. " * 4, doc_created
+                    )
+                    for c in range(flashcards_per_document)
+                ]
+            )
+
+            cursor.executemany(
+                "INSERT INTO summaries (id, document_id, content, created_at) VALUES (?, ?, ?, ?)",
+                [
+                    (str(uuid.uuid4()), document_id, f"Summary of document {u}-{d}. " * 20, doc_created)
+                    for _ in range(summaries_per_document)
+                ]
+            )
+
+            cursor.execute(
+                "INSERT INTO study_progress (id, user_id, document_id, quiz_score, flashcards_completed, last_accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (str(uuid.uuid4()), user_id, document_id, rng.random() * 100,
+                 rng.randrange(flashcards_per_document + 1), doc_created)
+            )
+
+    conn.commit()
+    return user_rows
@@ -0,0 +1,136 @@
+# Cold start measurements: import time and first-request latency
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+from .harness import BACKEND_DIR, git_commit
+
+# Runs in a fresh interpreter. backend is imported before anything else so
+# modules it shares with httpx (anyio, idna, ...) are charged to backend.
+PROBE = """
+import time
+started = time.perf_counter()
+import backend
+imported = time.perf_counter()
+
+import sys
+passlib_loaded = "passlib" in sys.modules
+sqlalchemy_loaded = "sqlalchemy" in sys.modules
+
+import asyncio, json, os
+import httpx
+
+async def first_request():
+    transport = httpx.ASGITransport(app=backend.app)
+    lifespan_started = time.perf_counter()
+    async with backend.app.router.lifespan_context(backend.app):
+        lifespan_done = time.perf_counter()
+        async with httpx.AsyncClient(transport=transport, base_url="http://probe") as client:
+            request_started = time.perf_counter()
+            response = await client.get("/health")
+            request_done = time.perf_counter()
+            response.raise_for_status()
+    return lifespan_done - lifespan_started, request_done - request_started
+
+db_touched_on_import = os.path.exists(backend.db.db_path)
+lifespan_s, first_request_s = asyncio.run(first_request())
+print(json.dumps({
+    "import_s": imported - started,
+    "lifespan_startup_s": lifespan_s,
+    "first_request_s": first_request_s,
+    "db_touched_on_import": db_touched_on_import,
+    "passlib_loaded": passlib_loaded,
+    "sqlalchemy_loaded": sqlalchemy_loaded,
+}))
+"""
+
+
+def probe_env(workdir):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [BACKEND_DIR, env.get("PYTHONPATH")]))
+    env["EDUPDF_DB_PATH"] = os.path.join(workdir, "app.db")
+    return env
+
+
+def parse_importtime(stderr):
+    # Lines look like "import time:  self [us] | cumulative | imported package",
+    # with the package name indented two spaces per nesting level
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+    return modules
+
+
+def import_profile(workdir):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend"],
+        cwd=workdir, env=probe_env(workdir), capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def first_request_probe(workdir):
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=workdir, env=probe_env(workdir), capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_startup(runs=5, top=15):
+    # Each run uses a fresh interpreter and a fresh database so nothing is
+    # warm except the OS page cache
+    import_totals = []
+    probes = []
+    modules = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix="edupdf-startup-") as workdir:
+            modules = import_profile(workdir)
+            backend_line = next(m for m in modules if m["module"] == "backend")
+            import_totals.append(backend_line["cumulative_us"])
+        with tempfile.TemporaryDirectory(prefix="edupdf-startup-") as workdir:
+            probes.append(first_request_probe(workdir))
+
+    def median_ms(key):
+        return round(statistics.median(p[key] for p in probes) * 1000.0, 3)
+
+    # Top-level packages (depth 1) pulled in by backend, heaviest first, from
+    # the last run
+    heaviest = sorted(
+        (m for m in modules if m["depth"] == 1),
+        key=lambda m: m["cumulative_us"], reverse=True,
+    )[:top]
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {"runs": runs},
+        },
+        "startup": {
+            "importtime_backend_ms": round(statistics.median(import_totals) / 1000.0, 3),
+            "import_ms": median_ms("import_s"),
+            "lifespan_startup_ms": median_ms("lifespan_startup_s"),
+            "first_request_ms": median_ms("first_request_s"),
+            "db_touched_on_import": any(p["db_touched_on_import"] for p in probes),
+            "passlib_loaded_on_import": any(p["passlib_loaded"] for p in probes),
+            "sqlalchemy_loaded_on_import": any(p["sqlalchemy_loaded"] for p in probes),
+            "heaviest_imports": heaviest,
+        },
+    }
@@ -0,0 +1,34 @@
+# backend.py is a single module next to this directory, not an installed package
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import backend  # noqa: E402
+
+
+@pytest.fixture
+def app_db(tmp_path, monkeypatch):
+    # Fresh database, uploads/ and thumbnails/ in a temporary working
+    # directory; yields the long-lived setup connection
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(backend, "db", backend.Database(str(tmp_path / "app.db")))
+    backend.db.setup_db()
+    conn = backend.db.get_connection()
+    backend.text_codec.load(conn)
+    yield conn
+    backend.db.close()
+
+
+def add_user(conn, name):
+    user = {"id": f"user-{name}", "email": f"{name}@example.com", "username": name}
+    conn.execute(
+        "INSERT INTO users (id, email, username, hashed_password, created_at) VALUES (?, ?, ?, ?, ?)",
+        (user["id"], user["email"], name, "x", "2026-01-01T00:00:00")
+    )
+    conn.commit()
+    return user
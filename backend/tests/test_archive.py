@@ -0,0 +1,243 @@
+# Library export/import round trip and rejection of incomplete archives
+
+import io
+import json
+import os
+import tarfile
+import uuid
+
+import pytest
+
+import backend
+from conftest import add_user
+
+SUMMARY = "The mitochondria is the powerhouse of the cell. " * 40
+PDF_BYTES = b"%PDF-1.4\n" + os.urandom(4096) + b"\n%%EOF\n"
+
+
+@pytest.fixture
+def library(app_db):
+    # One user owning a small library and one empty user to import into
+    conn = app_db
+    os.makedirs("uploads")
+    file_path = os.path.join("uploads", "source.pdf")
+    with open(file_path, "wb") as f:
+        f.write(PDF_BYTES)
+
+    users = {name: add_user(conn, name) for name in ("alice", "bob")}
+
+    document_id, quiz_id = str(uuid.uuid4()), str(uuid.uuid4())
+    conn.execute(
+        "INSERT INTO documents (id, title, user_id, file_path, page_count, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (document_id, "Biology", users["alice"]["id"], file_path, 3, "2026-01-01T00:00:00")
+    )
+    conn.execute("INSERT INTO quizzes (id, document_id, created_at) VALUES (?, ?, ?)",
+                 (quiz_id, document_id, "2026-01-01T00:00:00"))
+    conn.execute(
+        "INSERT INTO quiz_questions (id, quiz_id, question, options, correct_answer) VALUES (?, ?, ?, ?, ?)",
+        (str(uuid.uuid4()), quiz_id, backend.text_codec.encode("question", "What is ATP?"), "a,b,c,d", 2)
+    )
+    conn.execute(
+        "INSERT INTO flashcards (id, document_id, term, definition, created_at) VALUES (?, ?, ?, ?, ?)",
+        (str(uuid.uuid4()), document_id, "ATP", backend.text_codec.encode("flashcard", "Energy carrier"),
+         "2026-01-01T00:00:00")
+    )
+    conn.execute(
+        "INSERT INTO summaries (id, document_id, content, created_at) VALUES (?, ?, ?, ?)",
+        (str(uuid.uuid4()), document_id, backend.text_codec.encode("summary", SUMMARY), "2026-01-01T00:00:00")
+    )
+    conn.execute(
+        "INSERT INTO study_progress (id, user_id, document_id, quiz_score, flashcards_completed, last_accessed) VALUES (?, ?, ?, ?, ?, ?)",
+        (str(uuid.uuid4()), users["alice"]["id"], document_id, 75.0, 1, "2026-01-01T00:00:00")
+    )
+    conn.commit()
+    return users
+
+
+def export_archive(user):
+    return b"".join(backend.stream_library_export(user))
+
+
+def library_rows(user_id):
+    # Everything a user owns, without ids, in a comparable form
+    conn = backend.db.get_connection()
+    documents = conn.execute(
+        "SELECT id, title, file_path, page_count FROM documents WHERE user_id = ?", (user_id,)
+    ).fetchall()
+    result = {"documents": [], "summaries": [], "flashcards": [], "questions": [], "progress": []}
+    for document in documents:
+        with open(document["file_path"], "rb") as f:
+            result["documents"].append((document["title"], document["page_count"], f.read()))
+        for row in conn.execute("SELECT content FROM summaries WHERE document_id = ?", (document["id"],)):
+            result["summaries"].append(backend.text_codec.decode(row["content"]))
+        for row in conn.execute("SELECT term, definition FROM flashcards WHERE document_id = ?", (document["id"],)):
+            result["flashcards"].append((row["term"], backend.text_codec.decode(row["definition"])))
+        for row in conn.execute(
+            "SELECT qq.question, qq.correct_answer FROM quiz_questions qq JOIN quizzes q ON q.id = qq.quiz_id "
+            "WHERE q.document_id = ?", (document["id"],)
+        ):
+            result["questions"].append((backend.text_codec.decode(row["question"]), row["correct_answer"]))
+    for row in conn.execute("SELECT quiz_score, flashcards_completed FROM study_progress WHERE user_id = ?", (user_id,)):
+        result["progress"].append((row["quiz_score"], row["flashcards_completed"]))
+    return result
+
+
+def archive_members(data):
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r") as tar:
+        return [(member.name, tar.extractfile(member).read()) for member in tar]
+
+
+def build_archive(members):
+    return b"".join(backend.tar_bytes_member(name, content) for name, content in members) + b"\0" * 1024
+
+
+def upload_files():
+    return sorted(name for name in os.listdir("uploads"))
+
+
+def test_round_trip(library):
+    data = export_archive(library["alice"])
+    assert archive_members(data)[-1][0] == "trailer.json"
+
+    stats = backend.import_library(io.BytesIO(data), library["bob"]["id"])
+
+    assert stats["documents"] == 1 and stats["summaries"] == 1 and stats["quiz_questions"] == 1
+    assert library_rows(library["bob"]["id"]) == library_rows(library["alice"]["id"])
+    assert library_rows(library["bob"]["id"])["summaries"] == [SUMMARY]
+
+
+@pytest.mark.parametrize("cut", [0.3, 0.6, 0.9])
+def test_truncated_archive_is_rejected(library, cut):
+    data = export_archive(library["alice"])
+    before = upload_files()
+
+    with pytest.raises(ValueError):
+        backend.import_library(io.BytesIO(data[:int(len(data) * cut)]), library["bob"]["id"])
+
+    assert library_rows(library["bob"]["id"])["documents"] == []
+    assert upload_files() == before
+
+
+def test_archive_without_trailer_is_rejected(library):
+    # Cut exactly at a member boundary, which tar itself cannot detect
+    members = archive_members(export_archive(library["alice"]))
+    assert members[-1][0] == "trailer.json"
+
+    with pytest.raises(ValueError, match="truncated"):
+        backend.import_library(io.BytesIO(build_archive(members[:-1])), library["bob"]["id"])
+    assert library_rows(library["bob"]["id"])["documents"] == []
+
+
+def test_trailer_count_mismatch_is_rejected(library):
+    members = archive_members(export_archive(library["alice"]))
+    members = [(name, content) for name, content in members if not name.startswith("summaries/")]
+
+    with pytest.raises(ValueError, match="counts"):
+        backend.import_library(io.BytesIO(build_archive(members)), library["bob"]["id"])
+    assert library_rows(library["bob"]["id"])["documents"] == []
+
+
+def test_reimport_does_not_duplicate(library):
+    data = export_archive(library["alice"])
+    backend.import_library(io.BytesIO(data), library["bob"]["id"])
+    imported = library_rows(library["bob"]["id"])
+    before = upload_files()
+
+    with pytest.raises(ValueError, match="already imported"):
+        backend.import_library(io.BytesIO(data), library["bob"]["id"])
+
+    assert library_rows(library["bob"]["id"]) == imported
+    assert upload_files() == before
+
+
+@pytest.mark.parametrize("line", [b"[1, 2]\n", b"\"text\"\n", b"{\"id\": 1}\n", b"not json\n"])
+def test_malformed_rows_are_rejected(library, line):
+    manifest = {"format": backend.ARCHIVE_FORMAT, "version": backend.ARCHIVE_VERSION, "export_id": str(uuid.uuid4())}
+    rows = {table: 0 for table, _ in backend.ARCHIVE_TABLES}
+    rows["documents"] = 1
+    data = build_archive([
+        ("manifest.json", json.dumps(manifest).encode()),
+        ("documents/000001.ndjson", line),
+        ("trailer.json", json.dumps({"blobs": 0, "rows": rows}).encode()),
+    ])
+
+    with pytest.raises(ValueError):
+        backend.import_library(io.BytesIO(data), library["bob"]["id"])
+    assert library_rows(library["bob"]["id"])["documents"] == []
+
+
+def test_duplicate_row_ids_are_rejected(library):
+    members = archive_members(export_archive(library["alice"]))
+    members = [
+        (name, content * 2 if name.startswith("flashcards/") else content)
+        for name, content in members if name != "trailer.json"
+    ]
+    trailer = json.loads(dict(archive_members(export_archive(library["alice"])))["trailer.json"])
+    trailer["rows"]["flashcards"] *= 2
+    members.append(("trailer.json", json.dumps(trailer).encode()))
+
+    with pytest.raises(ValueError, match="duplicate ids"):
+        backend.import_library(io.BytesIO(build_archive(members)), library["bob"]["id"])
+    assert library_rows(library["bob"]["id"])["documents"] == []
+
+
+def test_aborted_import_keeps_files_of_concurrent_import(library):
+    # The first import stores the PDF but fails before committing; the second
+    # must not have deduplicated against the file the first one removes
+    data = export_archive(library["alice"])
+    carol = add_user(backend.db.get_connection(), "carol")
+    first = backend.LibraryImporter(backend.db.connect(), library["bob"]["id"])
+    first.create_staging_tables()
+    first.read_archive(io.BytesIO(data))
+    second = backend.LibraryImporter(backend.db.connect(), carol["id"])
+    second.create_staging_tables()
+    second.read_archive(io.BytesIO(data))
+
+    first.abort()
+    first.conn.close()
+    second.commit_staged_rows()
+    second.conn.close()
+
+    assert library_rows(carol["id"]) == library_rows(library["alice"]["id"])
+    assert library_rows(library["bob"]["id"])["documents"] == []
+
+
+def test_delete_during_import_fails_the_import(library):
+    # The second import deduplicates against bob's copy of the PDF, which is
+    # deleted before it commits
+    data = export_archive(library["alice"])
+    backend.import_library(io.BytesIO(data), library["bob"]["id"])
+    carol = add_user(backend.db.get_connection(), "carol")
+    importer = backend.LibraryImporter(backend.db.connect(), carol["id"])
+    importer.create_staging_tables()
+    importer.read_archive(io.BytesIO(data))
+    assert importer.stats["blobs_deduplicated"] == 1
+
+    (bob_document,) = backend.db.get_connection().execute(
+        "SELECT id FROM documents WHERE user_id = ?", (library["bob"]["id"],)
+    ).fetchall()
+    conn = backend.db.connect()
+    backend.delete_document(bob_document["id"], current_user=library["bob"], conn=conn)
+    conn.close()
+
+    with pytest.raises(ValueError, match="deleted"):
+        importer.commit_staged_rows()
+    importer.abort()
+    importer.conn.close()
+    assert library_rows(carol["id"])["documents"] == []
+
+
+@pytest.mark.parametrize("table, column", [("documents", "title"), ("summaries", "created_at"), ("flashcards", "term")])
+def test_missing_required_field_is_reported(library, table, column):
+    members = []
+    for name, content in archive_members(export_archive(library["alice"])):
+        if name.startswith(f"{table}/"):
+            records = [json.loads(line) for line in content.splitlines()]
+            for record in records:
+                record[column] = None
+            content = b"".join(json.dumps(record).encode() + b"\n" for record in records)
+        members.append((name, content))
+
+    with pytest.raises(backend.ArchiveError, match=f"has no {column}"):
+        backend.import_library(io.BytesIO(build_archive(members)), library["bob"]["id"])
+    assert library_rows(library["bob"]["id"])["documents"] == []
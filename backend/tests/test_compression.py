@@ -0,0 +1,130 @@
+# Compressed text columns: TextCodec and the compress-text migration
+
+import random
+import string
+
+import pytest
+
+import backend
+
+WORDS = ["cell", "energy", "membrane", "protein", "enzyme", "nucleus", "transport", "gradient", "ribosome", "lipid"]
+
+
+@pytest.fixture(params=["zstd", "zlib"])
+def codec(request, app_db, monkeypatch):
+    # The global codec, loaded with only zlib available or with zstandard
+    if request.param == "zstd":
+        pytest.importorskip("zstandard")
+    else:
+        monkeypatch.setattr(backend, "load_zstandard", lambda: None)
+    backend.text_codec.load(app_db)
+    return backend.CODEC_ZSTD if request.param == "zstd" else backend.CODEC_ZLIB
+
+
+def page(rng, words=300):
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + "."
+
+
+def add_summaries(conn, count, seed=0):
+    rng = random.Random(seed)
+    texts = {f"summary-{i}": page(rng) for i in range(count)}
+    conn.executemany(
+        "INSERT INTO summaries (id, document_id, content, created_at) VALUES (?, ?, ?, ?)",
+        [(summary_id, "doc", text, "2026-01-01T00:00:00") for summary_id, text in texts.items()]
+    )
+    conn.commit()
+    return texts
+
+
+def stored_summaries(conn):
+    return {row["id"]: row["content"] for row in conn.execute("SELECT id, content FROM summaries")}
+
+
+def header(value):
+    return backend.COMPRESSION_HEADER.unpack_from(value)
+
+
+def test_round_trip_without_dictionary(codec):
+    text = page(random.Random(1))
+    encoded = backend.text_codec.encode("summary", text)
+
+    assert isinstance(encoded, bytes) and len(encoded) < len(text)
+    assert header(encoded) == (codec, 0)
+    assert backend.text_codec.decode(encoded) == text
+
+
+def test_round_trip_with_dictionary(codec, app_db):
+    texts = add_summaries(app_db, 300)
+
+    stats = backend.compress_existing_text(app_db)
+
+    assert stats["summary"] == len(texts)
+    dictionary_id = backend.text_codec.current["summary"]
+    assert backend.text_codec.dictionaries[dictionary_id][0] == codec
+    stored = stored_summaries(app_db)
+    assert all(header(value) == (codec, dictionary_id) for value in stored.values())
+    assert {k: backend.text_codec.decode(v) for k, v in stored.items()} == texts
+
+    # New values use the dictionary as well
+    text = page(random.Random(2))
+    encoded = backend.text_codec.encode("summary", text)
+    assert header(encoded) == (codec, dictionary_id)
+    assert backend.text_codec.decode(encoded) == text
+
+
+def test_short_and_incompressible_values_stay_text(codec):
+    short = "x" * (backend.COMPRESSION_MIN_BYTES - 1)
+    rng = random.Random(0)
+    incompressible = "".join(rng.choice(string.printable[:94]) for _ in range(100))
+
+    assert backend.text_codec.encode("summary", short) == short
+    assert backend.text_codec.encode("summary", incompressible) == incompressible
+    assert backend.text_codec.decode(short) == short
+
+
+def test_migration_is_safe_to_rerun(codec, app_db):
+    texts = add_summaries(app_db, 300)
+    backend.compress_existing_text(app_db)
+    first = stored_summaries(app_db)
+
+    stats = backend.compress_existing_text(app_db, vacuum=True)
+
+    assert stats == {"summary": 0, "flashcard": 0, "question": 0}
+    assert app_db.execute("SELECT COUNT(*) FROM compression_dictionaries").fetchone()[0] == 1
+    assert stored_summaries(app_db) == first
+    assert {k: backend.text_codec.decode(v) for k, v in first.items()} == texts
+
+
+def test_rows_written_during_migration_are_picked_up_on_rerun(codec, app_db):
+    add_summaries(app_db, 300)
+    backend.compress_existing_text(app_db)
+    app_db.execute(
+        "INSERT INTO summaries (id, document_id, content, created_at) VALUES (?, ?, ?, ?)",
+        ("late", "doc", page(random.Random(3)), "2026-01-01T00:00:00")
+    )
+    app_db.commit()
+
+    assert backend.compress_existing_text(app_db)["summary"] == 1
+    assert isinstance(stored_summaries(app_db)["late"], bytes)
+
+
+def test_reloads_dictionaries_added_by_another_process(codec, app_db, monkeypatch):
+    # The server's codec was loaded before compress-text trained a
+    # dictionary with its own connection and codec
+    texts = add_summaries(app_db, 300)
+    server_codec = backend.text_codec
+    with monkeypatch.context() as m:
+        m.setattr(backend, "text_codec", backend.TextCodec())
+        migration_conn = backend.db.connect()
+        backend.compress_existing_text(migration_conn)
+        migration_conn.close()
+
+    assert server_codec.dictionaries == {}
+    stored = stored_summaries(app_db)
+    assert {k: server_codec.decode(v) for k, v in stored.items()} == texts
+
+
+def test_unknown_dictionary_id_raises(codec):
+    value = backend.COMPRESSION_HEADER.pack(backend.CODEC_ZLIB, 12345) + b"\x00"
+    with pytest.raises(ValueError, match="12345"):
+        backend.text_codec.decode(value)
@@ -0,0 +1,83 @@
+# Every request works on its own connection and transaction
+
+import threading
+
+from fastapi.testclient import TestClient
+
+import backend
+from conftest import add_user
+
+
+def client_for(conn, name="alice"):
+    user = add_user(conn, name)
+    conn.execute(
+        "INSERT INTO documents (id, title, user_id, file_path, page_count, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (f"doc-{name}", "Biology", user["id"], "uploads/missing.pdf", 3, "2026-01-01T00:00:00")
+    )
+    conn.commit()
+    token = backend.create_access_token({"sub": user["id"]})
+    client = TestClient(backend.app, raise_server_exceptions=False)
+    client.headers["Authorization"] = f"Bearer {token}"
+    return client
+
+
+def test_failed_request_leaves_nothing_for_the_next_one(app_db, monkeypatch):
+    client = client_for(app_db)
+    encode = backend.text_codec.encode
+
+    def failing_encode(artifact, text):
+        # The quiz row is already inserted when the first question is encoded
+        if artifact == "question":
+            raise RuntimeError("boom")
+        return encode(artifact, text)
+
+    monkeypatch.setattr(backend.text_codec, "encode", failing_encode)
+    assert client.post("/documents/doc-alice/quiz").status_code == 500
+
+    # A later request that commits must not commit the failed quiz with it
+    assert client.post("/documents/doc-alice/progress", params={"quiz_score": 50}).status_code == 200
+    assert app_db.execute("SELECT COUNT(*) FROM quizzes").fetchone()[0] == 0
+    assert app_db.execute("SELECT COUNT(*) FROM study_progress").fetchone()[0] == 1
+
+
+def test_commit_does_not_include_another_requests_rows(app_db, monkeypatch):
+    client = client_for(app_db)
+    generate = backend.generate_flashcards
+    encoded = []
+    inserting = threading.Event()
+    release = threading.Event()
+
+    def slow_encode(artifact, text, encode=backend.text_codec.encode):
+        # Hold the flashcards request after its first insert, then fail it
+        if artifact == "flashcard":
+            encoded.append(text)
+            if len(encoded) == 2:
+                inserting.set()
+                release.wait(5)
+                raise RuntimeError("boom")
+        return encode(artifact, text)
+
+    monkeypatch.setattr(backend, "generate_flashcards", lambda text: generate(text, num_cards=2))
+    monkeypatch.setattr(backend.text_codec, "encode", slow_encode)
+
+    responses = {}
+
+    def post(name, path):
+        responses[name] = client.post(path)
+
+    flashcards = threading.Thread(target=post, args=("flashcards", "/documents/doc-alice/flashcards"))
+    flashcards.start()
+    assert inserting.wait(5)
+    # The summary request waits for the flashcards transaction instead of
+    # committing it along with its own row
+    summary = threading.Thread(target=post, args=("summary", "/documents/doc-alice/summary"))
+    summary.start()
+    summary.join(0.2)
+    release.set()
+    flashcards.join()
+    summary.join()
+
+    assert responses["flashcards"].status_code == 500
+    assert responses["summary"].status_code == 200
+    assert app_db.execute("SELECT COUNT(*) FROM flashcards").fetchone()[0] == 0
+    assert app_db.execute("SELECT COUNT(*) FROM summaries").fetchone()[0] == 1
@@ -0,0 +1,251 @@
+# Page thumbnails: the disk LRU cache, the renderer and the endpoint
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend
+from conftest import add_user
+
+
+@pytest.fixture
+def renderer(app_db, monkeypatch):
+    renderer = backend.ThumbnailRenderer(backend.ThumbnailCache("thumbnails", 1024 * 1024), max_workers=1)
+    monkeypatch.setattr(backend, "thumbnail_renderer", renderer)
+    yield renderer
+    renderer.shutdown()
+
+
+@pytest.fixture
+def client(app_db):
+    user = add_user(app_db, "alice")
+    os.makedirs("uploads")
+    client = TestClient(backend.app, raise_server_exceptions=False)
+    client.headers["Authorization"] = f"Bearer {backend.create_access_token({'sub': user['id']})}"
+    client.user = user
+    return client
+
+
+def add_document(conn, user, document_id, file_path, page_count=1):
+    conn.execute(
+        "INSERT INTO documents (id, title, user_id, file_path, page_count, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (document_id, "Biology", user["id"], file_path, page_count, "2026-01-01T00:00:00")
+    )
+    conn.commit()
+
+
+def test_renders_page(app_db, renderer, client):
+    pymupdf = pytest.importorskip("pymupdf")
+    with pymupdf.open() as pdf:
+        pdf.new_page()
+        pdf.save("uploads/ok.pdf")
+    add_document(app_db, client.user, "ok", "uploads/ok.pdf")
+
+    response = client.get("/documents/ok/pages/1/thumbnail")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.content.startswith(b"\xff\xd8")
+
+
+@pytest.mark.parametrize("content", [None, b"", b"%PDF-1.4 not really a pdf"])
+def test_missing_or_corrupt_file_is_not_found(app_db, renderer, client, content):
+    pytest.importorskip("pymupdf")
+    if content is not None:
+        with open("uploads/broken.pdf", "wb") as f:
+            f.write(content)
+    add_document(app_db, client.user, "broken", "uploads/broken.pdf")
+
+    response = client.get("/documents/broken/pages/1/thumbnail")
+    assert response.status_code == 404
+    assert "readable" in response.json()["detail"]
+
+
+def test_render_errors_are_builtin(tmp_path):
+    pytest.importorskip("pymupdf")
+    with pytest.raises(ValueError):
+        backend.render_page_thumbnail(str(tmp_path / "missing.pdf"), 1, 100)
+
+
+# ThumbnailCache
+
+def cached(cache, key, data):
+    cache.start_render(key)
+    cache.put(key, data)
+
+
+def cache_files(cache):
+    return sorted(os.listdir(cache.cache_dir))
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = backend.ThumbnailCache(str(tmp_path), max_bytes=250)
+    cache.load()
+    cached(cache, "a", b"a" * 100)
+    cached(cache, "b", b"b" * 100)
+    assert cache.get("a") == b"a" * 100
+
+    cached(cache, "c", b"c" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"a" * 100 and cache.get("c") == b"c" * 100
+    assert cache_files(cache) == ["a", "c"]
+    assert cache.total_bytes == 200
+
+
+def test_cache_keeps_entry_larger_than_the_cache(tmp_path):
+    cache = backend.ThumbnailCache(str(tmp_path), max_bytes=250)
+    cache.load()
+    cached(cache, "a", b"a" * 100)
+
+    cached(cache, "big", b"x" * 400)
+
+    assert cache.get("big") == b"x" * 400
+    assert cache_files(cache) == ["big"]
+
+
+def test_cache_load_restores_lru_order(tmp_path):
+    cache = backend.ThumbnailCache(str(tmp_path), max_bytes=250)
+    cache.load()
+    for number, key in enumerate(["a.jpg", "b.jpg"]):
+        cached(cache, key, key[0].encode() * 100)
+        os.utime(tmp_path / key, (1000 + number, 1000 + number))
+    os.utime(tmp_path / "a.jpg", (2000, 2000))
+
+    reloaded = backend.ThumbnailCache(str(tmp_path), max_bytes=250)
+    reloaded.load()
+    cached(reloaded, "c.jpg", b"c" * 100)
+
+    assert cache_files(reloaded) == ["a.jpg", "c.jpg"]
+
+
+def test_cache_ignores_renders_it_did_not_start(tmp_path):
+    cache = backend.ThumbnailCache(str(tmp_path), max_bytes=250)
+    cache.load()
+    cache.put("a", b"a")
+    assert cache.get("a") is None and cache_files(cache) == []
+
+
+def test_discard_document_drops_entries_and_in_flight_renders(tmp_path):
+    cache = backend.ThumbnailCache(str(tmp_path), max_bytes=1000)
+    cache.load()
+    cached(cache, cache.key("doc", 1, 200), b"1")
+    cached(cache, cache.key("other", 1, 200), b"2")
+    cache.start_render(cache.key("doc", 2, 200))
+
+    cache.discard_document("doc")
+    cache.put(cache.key("doc", 2, 200), b"late")
+
+    assert cache_files(cache) == [cache.key("other", 1, 200)]
+    assert cache.total_bytes == 1
+
+
+# ThumbnailRenderer, with a thread pool and a stubbed render_page_thumbnail
+
+@pytest.fixture
+def stub_renderer(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        backend, "ProcessPoolExecutor", lambda max_workers, mp_context: ThreadPoolExecutor(max_workers)
+    )
+    cache = backend.ThumbnailCache(str(tmp_path / "thumbnails"), max_bytes=1024 * 1024)
+    renderer = backend.ThumbnailRenderer(cache, max_workers=2)
+    yield renderer
+    renderer.shutdown()
+
+
+def stub_render(monkeypatch, render):
+    calls = []
+
+    def render_page_thumbnail(file_path, page_number, width):
+        calls.append((file_path, page_number, width))
+        return render(len(calls))
+
+    monkeypatch.setattr(backend, "render_page_thumbnail", render_page_thumbnail)
+    return calls
+
+
+def test_concurrent_requests_share_one_render(stub_renderer, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def render(call):
+        started.set()
+        release.wait(5)
+        return b"jpeg"
+
+    calls = stub_render(monkeypatch, render)
+
+    async def main():
+        requests = [
+            asyncio.ensure_future(stub_renderer.get_thumbnail("doc", "doc.pdf", 1)) for _ in range(5)
+        ]
+        await asyncio.to_thread(started.wait, 5)
+        # A client going away does not cancel the render for the others
+        requests[0].cancel()
+        release.set()
+        results = await asyncio.gather(*requests[1:])
+        return results, await stub_renderer.get_thumbnail("doc", "doc.pdf", 1)
+
+    results, cached_result = asyncio.run(main())
+    assert results == [b"jpeg"] * 4 and cached_result == b"jpeg"
+    assert len(calls) == 1
+    assert stub_renderer.in_flight == {}
+
+
+def test_render_of_discarded_document_is_not_cached(stub_renderer, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def render(call):
+        started.set()
+        release.wait(5)
+        return b"jpeg"
+
+    stub_render(monkeypatch, render)
+
+    async def main():
+        request = asyncio.ensure_future(stub_renderer.get_thumbnail("doc", "doc.pdf", 1))
+        await asyncio.to_thread(started.wait, 5)
+        stub_renderer.cache.discard_document("doc")
+        release.set()
+        return await request
+
+    assert asyncio.run(main()) == b"jpeg"
+    key = stub_renderer.cache.key("doc", 1, backend.THUMBNAIL_WIDTH)
+    assert stub_renderer.cache.get(key) is None
+    assert cache_files(stub_renderer.cache) == []
+
+
+def test_broken_pool_is_replaced_and_retried(stub_renderer, monkeypatch):
+    def render(call):
+        if call == 1:
+            raise BrokenProcessPool("worker died")
+        return b"jpeg"
+
+    calls = stub_render(monkeypatch, render)
+
+    async def main():
+        await stub_renderer.get_thumbnail("doc", "doc.pdf", 1)
+        return stub_renderer.executor
+
+    first_executor = stub_renderer.get_executor()
+    assert asyncio.run(main()) is not first_executor
+    assert len(calls) == 2
+
+
+def test_render_that_keeps_breaking_the_pool_fails_and_next_one_recovers(stub_renderer, monkeypatch):
+    def render(call):
+        if call <= 2:
+            raise BrokenProcessPool("worker died")
+        return b"jpeg"
+
+    stub_render(monkeypatch, render)
+
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(stub_renderer.get_thumbnail("doc", "doc.pdf", 1))
+    assert asyncio.run(stub_renderer.get_thumbnail("doc", "doc.pdf", 2)) == b"jpeg"
+    assert stub_renderer.cache.rendering == set()